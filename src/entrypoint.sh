@@ -16,7 +16,10 @@ invoke () {
 
 # Start cron && memcached services
 service cron restart
-service memcached restart
+# a shared memcached (MEMCACHED_LOCATION elsewhere) makes the local one useless
+case "${MEMCACHED_LOCATION:-127.0.0.1:11211}" in
+    127.0.0.1:*|localhost:*|unix:*) service memcached restart ;;
+esac
 
 echo $"\n\n\n"
 echo "-----------------------------------------------------"
@@ -4,11 +4,13 @@
 @Date : 2022-01-15
 @Author : CPoole
 """
+from django.conf import settings
 from django.contrib import admin
 from django.contrib import messages
 from django.utils.translation import ngettext
-from geonode.people.signals import _add_user_to_registered_members
 from undp_png.models import CuratedThumbnailLarge
+from undp_png.people import activate_users
+from undp_png.tasks import activate_users as activate_users_task
 
 
 class CuratedThumbnailLargeAdmin(admin.ModelAdmin):
@@ -20,14 +22,21 @@ admin.site.register(CuratedThumbnailLarge, CuratedThumbnailLargeAdmin)
 
 
 def make_user_active(modeladmin, request, queryset):
-    updated = queryset.update(is_active=True)
+    user_ids = list(queryset.values_list('pk', flat=True))
+    if len(user_ids) > getattr(settings, 'USER_ACTIVATION_ASYNC_THRESHOLD', 500):
+        result = activate_users_task.apply_async(args=(user_ids,))
+        modeladmin.message_user(request, ngettext(
+            '%d user is being marked as active in the background (task %s).',
+            '%d users are being marked as active in the background (task %s).',
+            len(user_ids),
+        ) % (len(user_ids), result.id), messages.INFO)
+        return
+    updated = activate_users(user_ids)
     modeladmin.message_user(request, ngettext(
         '%d user was successfully marked as active.',
         '%d users were successfully marked as active.',
         updated,
     ) % updated, messages.SUCCESS)
-    for user in queryset:
-        _add_user_to_registered_members(user)
 
 
 make_user_active.short_description = "Mark selected users as active"
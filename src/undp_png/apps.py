@@ -24,7 +24,7 @@ import os
 from django.apps import AppConfig as BaseAppConfig
 from django.conf import settings
 from django.contrib.staticfiles.templatetags import staticfiles
-from django.forms import model_to_dict, HiddenInput
+from django.forms import model_to_dict
 from django.utils.translation import ugettext_lazy as _
 
 
@@ -59,12 +59,15 @@ class AppConfig(BaseAppConfig):
     def ready(self):
         super(AppConfig, self).ready()
         run_setup_hooks()
+        from .signals import connect_signals
+        connect_signals()
         from geonode.documents.forms import DocumentForm
         from geonode.geoapps.forms import GeoAppForm
         from geonode.layers.forms import LayerForm
         from geonode.maps.forms import MapForm
         from geonode.people.admin import ProfileAdmin
 
+        from geonode.base.models import CuratedThumbnail
         from geonode.base.api.serializers import ThumbnailUrlField
         from geonode.api.resourcebase_api import CommonModelApi, LayerResource, MapResource, GeoAppResource, \
             DocumentResource
@@ -78,54 +81,46 @@ class AppConfig(BaseAppConfig):
         self.patch_layer_resource_model_api(LayerResource)
         self.patch_geoapps_resource_model_api(GeoAppResource)
         self.patch_map_resource_model_api(MapResource)
+        self.patch_thumbnail(CuratedThumbnail)
         self.patch_thumb_serializer(ThumbnailUrlField)
         self.patch_invite_function(GeoNodeSendInvite)
         self.add_mapbox_wmts_sources(GeoNodeMapStore2ConfigConverter)
         self.patch_profile_admin_actions(ProfileAdmin)
+        self.route_task_queues()
+
+    def route_task_queues(self):
+        self._get_logger().info("Routing GeoNode tasks to the undp_png queues")
+
+        from geonode.celery_app import app as geonode_celery_app
+        from .celeryapp import app as celeryapp
+        from .queues import override_task_queues
+
+        override_task_queues(celeryapp, geonode_celery_app)
 
     def patch_resource_base(self, form):
         self._get_logger().info("Patching Resource Base")
 
+        from .forms import ResourceFormSpec
+
         form.Meta.exclude = [*form.Meta.exclude, *self.hidden_metadata_fields()]
+        spec = ResourceFormSpec(
+            form,
+            exclude=form.Meta.exclude,
+            labels={
+                'abstract': _('Description'),
+                'attribution': _('Source'),
+                'constraints_other': _('Constraints / Caveats'),
+            },
+            help_texts={
+                'attribution': _('Who created the dataset?'),
+                'group': _('Who should have access to the data?'),
+            },
+            hidden=self.hidden_metadata_fields())
 
         def __init__(kls, *args, **kwargs):
 
             super(form, kls).__init__(*args, **kwargs)
-            cols_to_exclude = [f for f in kls.fields.keys() if f in kls.Meta.exclude]
-            [kls.fields.pop(_) for _ in cols_to_exclude]
-            abstract = kls.fields.get("abstract")
-            if abstract:
-                abstract.label = _('Description')
-
-            attribution = kls.fields.get("attribution")
-            attribution_help_text = _('Who created the dataset?')
-            if attribution:
-                attribution.label = _('Source')
-                attribution.help_text = attribution_help_text
-            for field in self.hidden_metadata_fields():
-                hide_field = kls.fields.get(field)
-                if hide_field:
-                    hide_field.hidden = True
-                    hide_field.widget = HiddenInput()
-
-            group_help_text = _('Who should have access to the data?')
-            group = kls.fields.get("group")
-            if group:
-                group.help_text = group_help_text
-            constraints_other = kls.fields.get("constraints_other")
-            if constraints_other:
-                constraints_other.label = _('Constraints / Caveats')
-
-            for field in kls.fields:
-                help_text = kls.fields[field].help_text
-                if help_text != '':
-                    kls.fields[field].widget.attrs.update(
-                        {
-                            'class': 'has-external-popover',
-                            'data-content': help_text,
-                            'data-placement': 'right',
-                            'data-container': 'body',
-                            'data-html': 'true'})
+            spec.apply(kls)
 
         form.__init__ = __init__
 
@@ -137,13 +132,9 @@ class AppConfig(BaseAppConfig):
         https://github.com/GeoNode/geonode/blob/42f5405bb1839910a6800ece8d31028049f90296/geonode/base/models.py#L1984
 
         """
-        from imagekit.models import ImageSpecField
         from imagekit import ImageSpec, register
         from imagekit.exceptions import AlreadyRegistered
         from imagekit.processors import ResizeToFill
-        from imagekit.cachefiles.backends import Simple
-        from django.core.files.storage import default_storage as storage
-        import os
 
         class LargeThumbnail(ImageSpec):
             processors = [ResizeToFill(420, 350)]
@@ -158,31 +149,20 @@ class AppConfig(BaseAppConfig):
             self._get_logger().exception(exc)
             pass
 
-        img_thumbnail = ImageSpecField(source='img',
-                                       processors=[ResizeToFill(420, 350)],
-                                       format='PNG',
-                                       options={'quality': 60})
         self._get_logger().info("Patching Thumbnail")
 
         @property
         def thumbnail_url(kls):
-            try:
-                if not Simple()._exists(kls.img_thumbnail):
-                    Simple().generate(kls.img_thumbnail, force=True)
-                upload_path = storage.path(kls.img_thumbnail.name)
-                actual_name = os.path.basename(storage.url(upload_path))
-                _upload_path = os.path.join(os.path.dirname(upload_path), actual_name)
-                if not os.path.exists(_upload_path):
-                    os.rename(upload_path, _upload_path)
-                return kls.img_thumbnail.url
-            except Exception as e:
-                print(e)
-            return ''
+            # rendered once by Celery on the mirrored CuratedThumbnailLarge, see mirror_curated_thumbnail
+            from .models import CuratedThumbnailLarge
+            return CuratedThumbnailLarge.objects.filter(
+                resource_id=kls.resource_id).values_list('img_thumbnail_url', flat=True).first() or ''
 
-        thumbnail_class.add_to_class("img_thumbnail", img_thumbnail)
+        # img_thumbnail is already declared by GeoNode, re-adding it would register its generator twice
         thumbnail_class.add_to_class("thumbnail_url", thumbnail_url)
 
     def patch_resourcemodel_api(self, commonmodel):
+        from .formatters import curated_thumbnail_url
 
         def format_objects(kls, objects):
             """
@@ -206,21 +186,10 @@ class AppConfig(BaseAppConfig):
                 formatted_obj['owner__username'] = obj.owner.username
                 formatted_obj['owner_name'] = obj.owner.get_full_name() or obj.owner.username
 
-                if hasattr(obj, 'curatedthumbnail'):
-                    try:
-                        if hasattr(obj.curatedthumbnail.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnail.thumbnail_url
-                        # Overwrite with large thumb instead
-                    except Exception as e:
-                        self._get_logger().exception(e)
                 # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnaillarge'):
-                    try:
-                        # Overwrite with large thumb instead
-                        if hasattr(obj.curatedthumbnaillarge.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnaillarge.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
+                thumbnail_url = curated_thumbnail_url(obj)
+                if thumbnail_url is not None:
+                    formatted_obj['thumbnail_url'] = thumbnail_url
 
                 formatted_objects.append(formatted_obj)
 
@@ -229,7 +198,8 @@ class AppConfig(BaseAppConfig):
         commonmodel.format_objects = format_objects
 
     def patch_geoapps_resource_model_api(self, geoappsmodel):
-        from geonode.groups.models import GroupProfile
+        from .formatters import format_resources
+
         def format_objects(kls, objects):
             """
             Formats the objects and provides reference to list of layers in GeoApp
@@ -237,56 +207,13 @@ class AppConfig(BaseAppConfig):
 
             :param objects: GeoApp objects
             """
-            formatted_objects = []
-            for obj in objects:
-                # convert the object to a dict using the standard values.
-                formatted_obj = model_to_dict(obj, fields=kls.VALUES)
-                username = obj.owner.get_username()
-                full_name = (obj.owner.get_full_name() or username)
-                formatted_obj['owner__username'] = username
-                formatted_obj['owner_name'] = full_name
-                if obj.category:
-                    formatted_obj['category__gn_description'] = obj.category.gn_description
-                if obj.group:
-                    formatted_obj['group'] = obj.group
-                    try:
-                        formatted_obj['group_name'] = GroupProfile.objects.get(slug=obj.group.name)
-                    except GroupProfile.DoesNotExist:
-                        formatted_obj['group_name'] = obj.group
-
-                formatted_obj['keywords'] = [k.name for k in obj.keywords.all()] if obj.keywords else []
-                formatted_obj['regions'] = [r.name for r in obj.regions.all()] if obj.regions else []
-
-                if 'site_url' not in formatted_obj or len(formatted_obj['site_url']) == 0:
-                    formatted_obj['site_url'] = settings.SITEURL
-
-                # Probe Remote Services
-                formatted_obj['store_type'] = 'geoapp'
-                formatted_obj['online'] = True
-
-                # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnail'):
-                    try:
-                        if hasattr(obj.curatedthumbnail.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnail.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-                        # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnaillarge'):
-                    try:
-                        # Overwrite with large thumb instead
-                        if hasattr(obj.curatedthumbnaillarge.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnaillarge.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-
-                formatted_objects.append(formatted_obj)
-            return formatted_objects
+            return format_resources(objects, kls.VALUES, 'geoapp')
 
         geoappsmodel.format_objects = format_objects
 
     def patch_document_resource_model_api(self, document_model):
-        from geonode.groups.models import GroupProfile
+        from .formatters import format_resources
+
         def format_objects(kls, objects):
             """
             Formats the objects and provides reference to list of layers in map
@@ -294,84 +221,20 @@ class AppConfig(BaseAppConfig):
 
             :param objects: Map objects
             """
-            formatted_objects = []
-            for obj in objects:
-                # convert the object to a dict using the standard values.
-                formatted_obj = model_to_dict(obj, fields=kls.VALUES)
-                username = obj.owner.get_username()
-                full_name = (obj.owner.get_full_name() or username)
-                formatted_obj['owner__username'] = username
-                formatted_obj['owner_name'] = full_name
-                if obj.category:
-                    formatted_obj['category__gn_description'] = _(obj.category.gn_description)
-                if obj.group:
-                    formatted_obj['group'] = obj.group
-                    try:
-                        formatted_obj['group_name'] = GroupProfile.objects.get(slug=obj.group.name)
-                    except GroupProfile.DoesNotExist:
-                        formatted_obj['group_name'] = obj.group
-
-                formatted_obj['keywords'] = [k.name for k in obj.keywords.all()] if obj.keywords else []
-                formatted_obj['regions'] = [r.name for r in obj.regions.all()] if obj.regions else []
-
-                if 'site_url' not in formatted_obj or len(formatted_obj['site_url']) == 0:
-                    formatted_obj['site_url'] = settings.SITEURL
-
-                # Probe Remote Services
-                formatted_obj['store_type'] = 'dataset'
-                formatted_obj['online'] = True
-
-                # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnail'):
-                    try:
-                        if hasattr(obj.curatedthumbnail.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnail.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-                if hasattr(obj, 'curatedthumbnaillarge'):
-                    try:
-                        # Overwrite with large thumb instead
-                        if hasattr(obj.curatedthumbnaillarge.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnaillarge.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-
-                formatted_objects.append(formatted_obj)
-            return formatted_objects
+            return format_resources(objects, kls.VALUES, 'dataset')
 
         document_model.format_objects = format_objects
 
     def patch_layer_resource_model_api(self, layer_model):
-        from geonode.groups.models import GroupProfile
+        from .formatters import format_resources, ogc_links
+
         def format_objects(kls, objects):
             """
             Formats the object.
             """
-            formatted_objects = []
-            for obj in objects:
-                # convert the object to a dict using the standard values.
-                # includes other values
-                values = kls.VALUES + [
-                    'alternate',
-                    'name'
-                ]
-                formatted_obj = model_to_dict(obj, fields=values)
-                username = obj.owner.get_username()
-                full_name = (obj.owner.get_full_name() or username)
-                formatted_obj['owner__username'] = username
-                formatted_obj['owner_name'] = full_name
-                if obj.category:
-                    formatted_obj['category__gn_description'] = _(obj.category.gn_description)
-                if obj.group:
-                    formatted_obj['group'] = obj.group
-                    try:
-                        formatted_obj['group_name'] = GroupProfile.objects.get(slug=obj.group.name)
-                    except GroupProfile.DoesNotExist:
-                        formatted_obj['group_name'] = obj.group
-
-                formatted_obj['keywords'] = [k.name for k in obj.keywords.all()] if obj.keywords else []
-                formatted_obj['regions'] = [r.name for r in obj.regions.all()] if obj.regions else []
+            probes = {}
 
+            def format_layer(obj, formatted_obj):
                 # provide style information
                 bundle = kls.build_bundle(obj=obj)
                 formatted_obj['default_style'] = kls.default_style.dehydrate(
@@ -380,48 +243,38 @@ class AppConfig(BaseAppConfig):
                 # Add resource uri
                 formatted_obj['resource_uri'] = kls.get_resource_uri(bundle)
 
-                formatted_obj['links'] = kls.dehydrate_ogc_links(bundle)
-
-                if 'site_url' not in formatted_obj or len(formatted_obj['site_url']) == 0:
-                    formatted_obj['site_url'] = settings.SITEURL
+                formatted_obj['links'] = ogc_links(obj)
 
                 # Probe Remote Services
-                formatted_obj['store_type'] = 'dataset'
-                formatted_obj['online'] = True
                 if hasattr(obj, 'storeType'):
                     formatted_obj['store_type'] = obj.storeType
                     if obj.storeType == 'remoteStore' and hasattr(obj, 'remote_service'):
                         if obj.remote_service:
-                            formatted_obj['online'] = (obj.remote_service.probe == 200)
+                            # probe each remote service once per page
+                            if obj.remote_service_id not in probes:
+                                probes[obj.remote_service_id] = obj.remote_service.probe
+                            formatted_obj['online'] = (probes[obj.remote_service_id] == 200)
                         else:
                             formatted_obj['online'] = False
 
                 formatted_obj['gtype'] = kls.dehydrate_gtype(bundle)
-
-                # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnail'):
-                    try:
-                        if hasattr(obj.curatedthumbnail.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnail.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-                if hasattr(obj, 'curatedthumbnaillarge'):
-                    try:
-                        # Overwrite with large thumb instead
-                        if hasattr(obj.curatedthumbnaillarge.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnaillarge.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-
                 formatted_obj['processed'] = obj.instance_is_processed
-                # put the object on the response stack
-                formatted_objects.append(formatted_obj)
-            return formatted_objects
+
+            # includes other values
+            values = kls.VALUES + [
+                'alternate',
+                'name'
+            ]
+            return format_resources(
+                objects, values, 'dataset',
+                prefetch=('default_style', 'link_set', 'remote_service', 'upload_session'),
+                extra=format_layer)
 
         layer_model.format_objects = format_objects
 
     def patch_map_resource_model_api(self, map_model):
-        from geonode.groups.models import GroupProfile
+        from .formatters import format_map_layers, format_resources
+
         def format_objects(kls, objects):
             """
             Formats the objects and provides reference to list of layers in map
@@ -429,73 +282,11 @@ class AppConfig(BaseAppConfig):
 
             :param objects: Map objects
             """
-            formatted_objects = []
-            for obj in objects:
-                # convert the object to a dict using the standard values.
-                formatted_obj = model_to_dict(obj, fields=kls.VALUES)
-                username = obj.owner.get_username()
-                full_name = (obj.owner.get_full_name() or username)
-                formatted_obj['owner__username'] = username
-                formatted_obj['owner_name'] = full_name
-                if obj.category:
-                    formatted_obj['category__gn_description'] = _(obj.category.gn_description)
-                if obj.group:
-                    formatted_obj['group'] = obj.group
-                    try:
-                        formatted_obj['group_name'] = GroupProfile.objects.get(slug=obj.group.name)
-                    except GroupProfile.DoesNotExist:
-                        formatted_obj['group_name'] = obj.group
-
-                formatted_obj['keywords'] = [k.name for k in obj.keywords.all()] if obj.keywords else []
-                formatted_obj['regions'] = [r.name for r in obj.regions.all()] if obj.regions else []
+            def format_map(obj, formatted_obj):
+                formatted_obj['layers'] = format_map_layers(obj)
 
-                if 'site_url' not in formatted_obj or len(formatted_obj['site_url']) == 0:
-                    formatted_obj['site_url'] = settings.SITEURL
-
-                # Probe Remote Services
-                formatted_obj['store_type'] = 'map'
-                formatted_obj['online'] = True
-
-                # get map layers
-                map_layers = obj.layers
-                formatted_layers = []
-                map_layer_fields = [
-                    'id',
-                    'stack_order',
-                    'format',
-                    'name',
-                    'opacity',
-                    'group',
-                    'visibility',
-                    'transparent',
-                    'ows_url',
-                    'layer_params',
-                    'source_params',
-                    'local'
-                ]
-                for layer in map_layers:
-                    formatted_map_layer = model_to_dict(
-                        layer, fields=map_layer_fields)
-                    formatted_layers.append(formatted_map_layer)
-                formatted_obj['layers'] = formatted_layers
-
-                # replace thumbnail_url with curated_thumbs
-                if hasattr(obj, 'curatedthumbnail'):
-                    try:
-                        if hasattr(obj.curatedthumbnail.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnail.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-                if hasattr(obj, 'curatedthumbnaillarge'):
-                    try:
-                        # Overwrite with large thumb instead
-                        if hasattr(obj.curatedthumbnaillarge.img_thumbnail, 'url'):
-                            formatted_obj['thumbnail_url'] = obj.curatedthumbnaillarge.thumbnail_url
-                    except Exception as e:
-                        self._get_logger().exception(e)
-
-                formatted_objects.append(formatted_obj)
-            return formatted_objects
+            return format_resources(
+                objects, kls.VALUES, 'map', prefetch=('layer_set',), extra=format_map)
 
         map_model.format_objects = format_objects
 
@@ -504,22 +295,11 @@ class AppConfig(BaseAppConfig):
             from geonode.utils import build_absolute_uri
         except ImportError:
             from geonode.base.utils import build_absolute_uri
+        from .formatters import curated_thumbnail_url
+
         def get_attribute(kls, instance):
-            thumbnail_url = instance.thumbnail_url
-            if hasattr(instance, 'curatedthumbnail'):
-                try:
-                    if hasattr(instance.curatedthumbnail.img_thumbnail, 'url'):
-                        thumbnail_url = instance.curatedthumbnail.thumbnail_url
-                except Exception as e:
-                    self._get_logger().exception(e)
             # curated thumbnail large overwrites
-            if hasattr(instance, 'curatedthumbnaillarge'):
-                try:
-                    if hasattr(instance.curatedthumbnaillarge.img_thumbnail, 'url'):
-                        thumbnail_url = instance.curatedthumbnaillarge.thumbnail_url
-                except Exception as e:
-                    self._get_logger().exception(e)
-
+            thumbnail_url = curated_thumbnail_url(instance) or instance.thumbnail_url
             return build_absolute_uri(thumbnail_url)
 
         thumbnailserializer.get_attribute = get_attribute
@@ -538,28 +318,24 @@ class AppConfig(BaseAppConfig):
                     kls.get_context_data(form=form))
 
         def geonode_invite_form_valid(kls, form):
-            emails = form.cleaned_data["email"]
-            invited = []
+            from django.db import transaction
+            from django.urls import reverse
+            from .invitations import create_invitations, schedule_invitations
 
-            invite = None
+            emails = form.cleaned_data["email"]
             try:
-                invites = form.save(emails)
-                for invite_obj in invites:
-                    invite = invite_obj
-                    invite.inviter = kls.request.user
-                    invite.save()
-                    # invite.send_invitation(self.request)
-                    kls.send_invitation(invite, kls.request)
-                    invited.append(invite_obj.email)
+                with transaction.atomic():
+                    invites = create_invitations(emails, kls.request.user)
+                    # sent by Celery, see undp_png.tasks.send_invitations
+                    schedule_invitations([_i.pk for _i in invites])
             except Exception as e:
-                if invite:
-                    invite.delete()
                 return kls.form_invalid(form, emails, e)
 
             return kls.render_to_response(
                 kls.get_context_data(
-                    success_message=_("Invitation successfully sent to '%(email)s'") % {
-                        "email": ', '.join(invited)}))
+                    success_message=_("Invitations to '%(email)s' are being sent, see %(status_url)s") % {
+                        "email": ', '.join(_i.email for _i in invites),
+                        "status_url": kls.request.build_absolute_uri(reverse('invitation_status'))}))
 
         invite_view.form_valid = geonode_invite_form_valid
         invite_view.form_invalid = geonode_invite_form_invalid
@@ -587,6 +363,25 @@ class AppConfig(BaseAppConfig):
         from django.conf import settings
         from mapstore2_adapter.plugins.geonode import unsafe_chars
 
+        from .mapstore import (
+            MAPBOX_SOURCES_PLACEHOLDER,
+            get_cached_map_config,
+            map_config_cache_enabled,
+            map_config_cache_key,
+            mapbox_sources_json,
+            resource_permissions,
+            set_cached_map_config,
+            splice_mapbox_sources,
+            unsafe_chars_escaper,
+        )
+
+        escape_unsafe_chars = unsafe_chars_escaper(unsafe_chars)
+
+        # build the Mapbox tile matrix set once, at startup
+        mapbox_sources_json()
+        if not map_config_cache_enabled():
+            self._get_logger().info("The mapstore cache is per process, MapStore2 configs are not cached.")
+
         def convert(kls, viewer, request):
             """
                 input: GeoNode JSON Gxp Config
@@ -602,6 +397,14 @@ class AppConfig(BaseAppConfig):
                 except Exception:
                     pass
 
+            # Repeat views of a map are served from the per-user config cache
+            cache_key = None
+            if map_id and map_config_cache_enabled():
+                cache_key = map_config_cache_key(map_id, getattr(request, 'user', None), viewer)
+                json_str = get_cached_map_config(cache_key)
+                if json_str is not None:
+                    return json_str
+
             data = {}
             data['version'] = 2
 
@@ -622,192 +425,8 @@ class AppConfig(BaseAppConfig):
                 else:
                     ms2_map['layers'] = MAP_BASELAYERS
 
-                # add mapbox sources
-                ms2_map['sources'] = {
-                    f"https://api.mapbox.com/styles/v1/mapbox/streets-v11/wmts?access_token={settings.MAPBOX_ACCESS_TOKEN}": {
-                        "tileMatrixSet": {
-                            "google3857": {
-                                'ows:Identifier': 'google3857',
-                                'ows:BoundingBox': {
-                                    "$": {
-                                        "crs": 'urn:ogc:def:crs:EPSG:6.18.3:3857'
-                                    },
-                                    'ows:LowerCorner': '977650 5838030',
-                                    'ows:UpperCorner': '1913530 6281290'
-                                },
-                                'ows:SupportedCRS': 'urn:ogc:def:crs:EPSG:6.18.3:3857',
-                                "WellKnownScaleSet": 'urn:ogc:def:wkss:OGC:1.0:GoogleMapsCompatible',
-                                "TileMatrix": [{'MatrixHeight': '1',
-                                                'MatrixWidth': '1',
-                                                'ScaleDenominator': '559082264.029',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '0'},
-                                               {'MatrixHeight': '2',
-                                                'MatrixWidth': '2',
-                                                'ScaleDenominator': '279541132.014',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '1'},
-                                               {'MatrixHeight': '4',
-                                                'MatrixWidth': '4',
-                                                'ScaleDenominator': '139770566.007',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '2'},
-                                               {'MatrixHeight': '8',
-                                                'MatrixWidth': '8',
-                                                'ScaleDenominator': '69885283.0036',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '3'},
-                                               {'MatrixHeight': '16',
-                                                'MatrixWidth': '16',
-                                                'ScaleDenominator': '34942641.5018',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '4'},
-                                               {'MatrixHeight': '32',
-                                                'MatrixWidth': '32',
-                                                'ScaleDenominator': '17471320.7509',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '5'},
-                                               {'MatrixHeight': '64',
-                                                'MatrixWidth': '64',
-                                                'ScaleDenominator': '8735660.37545',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '6'},
-                                               {'MatrixHeight': '128',
-                                                'MatrixWidth': '128',
-                                                'ScaleDenominator': '4367830.18772',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '7'},
-                                               {'MatrixHeight': '256',
-                                                'MatrixWidth': '256',
-                                                'ScaleDenominator': '2183915.09386',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '8'},
-                                               {'MatrixHeight': '512',
-                                                'MatrixWidth': '512',
-                                                'ScaleDenominator': '1091957.54693',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '9'},
-                                               {'MatrixHeight': '1024',
-                                                'MatrixWidth': '1024',
-                                                'ScaleDenominator': '545978.773466',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '10'},
-                                               {'MatrixHeight': '2048',
-                                                'MatrixWidth': '2048',
-                                                'ScaleDenominator': '272989.386733',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '11'},
-                                               {'MatrixHeight': '4096',
-                                                'MatrixWidth': '4096',
-                                                'ScaleDenominator': '136494.693366',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '12'},
-                                               {'MatrixHeight': '8192',
-                                                'MatrixWidth': '8192',
-                                                'ScaleDenominator': '68247.3466832',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '13'},
-                                               {'MatrixHeight': '16384',
-                                                'MatrixWidth': '16384',
-                                                'ScaleDenominator': '34123.6733416',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '14'},
-                                               {'MatrixHeight': '32768',
-                                                'MatrixWidth': '32768',
-                                                'ScaleDenominator': '17061.8366708',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '15'},
-                                               {'MatrixHeight': '65536',
-                                                'MatrixWidth': '65536',
-                                                'ScaleDenominator': '8530.9183354',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '16'},
-                                               {'MatrixHeight': '131072',
-                                                'MatrixWidth': '131072',
-                                                'ScaleDenominator': '4265.4591677',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '17'},
-                                               {'MatrixHeight': '262144',
-                                                'MatrixWidth': '262144',
-                                                'ScaleDenominator': '2132.72958385',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '18'},
-                                               {'MatrixHeight': '524288',
-                                                'MatrixWidth': '524288',
-                                                'ScaleDenominator': '1066.36479192',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '19'},
-                                               {'MatrixHeight': '1048576',
-                                                'MatrixWidth': '1048576',
-                                                'ScaleDenominator': '533.182395962',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '20'},
-                                               {'MatrixHeight': '2097152',
-                                                'MatrixWidth': '2097152',
-                                                'ScaleDenominator': '266.591197981',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '21'},
-                                               {'MatrixHeight': '4194304',
-                                                'MatrixWidth': '4194304',
-                                                'ScaleDenominator': '133.296',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '22'},
-                                               {'MatrixHeight': '8388608',
-                                                'MatrixWidth': '8388608',
-                                                'ScaleDenominator': '66.648',
-                                                'TileHeight': '256',
-                                                'TileWidth': '256',
-                                                'TopLeftCorner': '-20037508.3428 20037508.3428',
-                                                'ows:Identifier': '23'}]
-                            },
-
-                        }}}
+                # add mapbox sources, spliced in pre-serialized after json.dumps
+                ms2_map['sources'] = MAPBOX_SOURCES_PLACEHOLDER
                 if settings.BING_API_KEY:
                     ms2_map['bingApiKey'] = settings.BING_API_KEY
 
@@ -830,20 +449,10 @@ class AppConfig(BaseAppConfig):
 
                     try:
                         # - extract from GeoNode guardian
-                        from geonode.layers.views import (_resolve_layer,
-                                                          _PERMISSION_MSG_MODIFY,
-                                                          _PERMISSION_MSG_DELETE)
-                        if _resolve_layer(request,
-                                          selected['name'],
-                                          'base.change_resourcebase',
-                                          _PERMISSION_MSG_MODIFY):
-                            info['canEdit'] = True
-
-                        if _resolve_layer(request,
-                                          selected['name'],
-                                          'base.delete_resourcebase',
-                                          _PERMISSION_MSG_DELETE):
-                            info['canDelete'] = True
+                        from geonode.base.models import ResourceBase
+                        layer = ResourceBase.objects.filter(layer__alternate=selected['name']).first() or \
+                            ResourceBase.objects.filter(layer__name=selected['name']).first()
+                        info['canEdit'], info['canDelete'] = resource_permissions(request, layer)
                     except Exception:
                         tb = traceback.format_exc()
                         self._get_logger().debug(tb)
@@ -862,20 +471,9 @@ class AppConfig(BaseAppConfig):
                     }
                     try:
                         # - extract from GeoNode guardian
-                        from geonode.maps.views import (_resolve_map,
-                                                        _PERMISSION_MSG_SAVE,
-                                                        _PERMISSION_MSG_DELETE)
-                        if _resolve_map(request,
-                                        str(map_id),
-                                        'base.change_resourcebase',
-                                        _PERMISSION_MSG_SAVE):
-                            info['canEdit'] = True
-
-                        if _resolve_map(request,
-                                        str(map_id),
-                                        'base.delete_resourcebase',
-                                        _PERMISSION_MSG_DELETE):
-                            info['canDelete'] = True
+                        from geonode.base.models import ResourceBase
+                        info['canEdit'], info['canDelete'] = resource_permissions(
+                            request, ResourceBase.objects.filter(id=map_id).first())
                     except Exception:
                         tb = traceback.format_exc()
                         self._get_logger().debug(tb)
@@ -923,9 +521,11 @@ class AppConfig(BaseAppConfig):
                 self._get_logger().debug(tb)
 
             json_str = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
-            for (c, d) in unsafe_chars.items():
-                json_str = json_str.replace(c, d)
+            json_str = splice_mapbox_sources(json_str)
+            json_str = escape_unsafe_chars(json_str)
 
+            if cache_key:
+                set_cached_map_config(cache_key, json_str)
             return json_str
 
         ms2_config.convert = convert
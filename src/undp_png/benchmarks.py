@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the UNDP PNG hot paths, see the ``benchmark`` management command.
+
+Each benchmark returns the variants to time, the implementation being
+replaced first; the replaced implementations are kept here as ``legacy_*``
+so that the tests can check both agree.
+
+@Date : 2026-10-18
+"""
+import contextlib
+import io
+import json
+import logging
+import timeit
+
+logger = logging.getLogger(__name__)
+
+BENCHMARKS = {}
+
+LISTING_PATH = '/api/layers/?limit=20'
+# Overlays of the sample map configs, a large map of the portal
+SAMPLE_OVERLAYS = 200
+
+
+def benchmark(name):
+    """Register a function returning the ``(label, callable)`` variants of benchmark ``name``."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def run(name, number=100, repeat=5):
+    """Time the variants of benchmark ``name``; returns ``(label, best seconds per call)`` pairs."""
+    results = []
+    for label, func in BENCHMARKS[name]():
+        results.append((label, min(timeit.repeat(func, number=number, repeat=repeat)) / number))
+    return results
+
+
+@benchmark('listings')
+def listings():
+    """API listing latency with a new database connection per request against a reused one."""
+    from django.db import connections
+    from django.test import Client
+
+    client = Client()
+    connections.close_all()
+    for connection in connections.all():
+        connection.settings_dict['CONN_MAX_AGE'] = 60
+
+    def reconnect():
+        connections.close_all()
+        client.get(LISTING_PATH)
+
+    def reuse():
+        client.get(LISTING_PATH)
+
+    return [('CONN_MAX_AGE=0', reconnect), ('CONN_MAX_AGE=60', reuse)]
+
+
+def sample_map_config(overlays=SAMPLE_OVERLAYS):
+    """A converted MapStore2 config with ``overlays`` GeoServer layers, as a dict."""
+    layers = []
+    for index in range(overlays):
+        layers.append({
+            'id': f'geonode:png_layer_{index}__{index}',
+            'name': f'geonode:png_layer_{index}',
+            'title': f'Population & households <{2000 + index % 20}> in "Province {index}"',
+            'description': f"Census counts of <b>province {index}</b> & its districts, 'provisional'",
+            'type': 'wms',
+            'format': 'image/png',
+            'url': f'http://localhost/geoserver/ows?access_token=token{index}&service=WMS',
+            'visibility': index % 3 == 0,
+            'opacity': 1,
+            'bbox': {
+                'crs': 'EPSG:4326',
+                'bounds': {'minx': 140.8, 'miny': -11.7, 'maxx': 159.5, 'maxy': -1.0},
+            },
+            'search': {'type': 'wfs', 'url': 'http://localhost/geoserver/wfs'},
+            'catalogURL': None,
+            'params': {'styles': f'geonode:png_layer_{index}_style'},
+        })
+    return {
+        'version': 2,
+        'map': {
+            'projection': 'EPSG:3857',
+            'units': 'm',
+            'center': {'x': 147.18, 'y': -6.31, 'crs': 'EPSG:4326'},
+            'zoom': 6,
+            'maxExtent': [-20037508.34, -20037508.34, 20037508.34, 20037508.34],
+            'layers': layers,
+            'info': {'id': 1, 'name': 'Papua New Guinea <overview> & census', 'canEdit': False},
+        },
+    }
+
+
+def legacy_escape_unsafe_chars(json_str, unsafe_chars):
+    """The escaping of ``convert`` before ``unsafe_chars_escaper``: one copy per unsafe char."""
+    for (c, d) in unsafe_chars.items():
+        json_str = json_str.replace(c, d)
+    return json_str
+
+
+@benchmark('escape')
+def escape():
+    """Escaping of the unsafe characters of a serialized many overlay config."""
+    from mapstore2_adapter.plugins.geonode import unsafe_chars
+
+    from .mapstore import unsafe_chars_escaper
+
+    json_str = json.dumps(sample_map_config(), sort_keys=True)
+    escape_unsafe_chars = unsafe_chars_escaper(unsafe_chars)
+    return [
+        ('str.replace per char', lambda: legacy_escape_unsafe_chars(json_str, unsafe_chars)),
+        ('single pass', lambda: escape_unsafe_chars(json_str)),
+    ]
+
+
+def sample_print_spec(layers=SAMPLE_OVERLAYS):
+    """A MapFish print spec of the sample map, WMS overlays over a Mapbox WMTS background."""
+    spec_layers = [{
+        'baseURL': 'https://api.mapbox.com/styles/v1/mapbox/streets-v11/wmts',
+        'type': 'WMTS',
+        'layer': 'streets-v11',
+        'format': 'image/png',
+        'style': 'default',
+        'matrixSet': 'google3857',
+        'matrixIds': [{
+            'identifier': str(_zoom),
+            'resolution': 156543.03392804097 / 2 ** _zoom,
+            'tileSize': [256, 256],
+            'topLeftCorner': [-20037508.34, 20037508.34],
+            'matrixSize': [2 ** _zoom, 2 ** _zoom],
+        } for _zoom in range(24)],
+        'customParams ': {'TRANSPARENT': True},
+    }]
+    for index in range(layers):
+        spec_layers.append({
+            'baseURL': 'http://localhost/geoserver/wms',
+            'type': 'WMS',
+            'layers': [f'geonode:png_layer_{index}'],
+            'styles': [f'geonode:png_layer_{index}_style'],
+            'format': 'image/png',
+            'opacity': 1,
+            'customParams': {'TRANSPARENT': True, 'TILED': True, 'access_token': f'token{index}'},
+        })
+    return {
+        'units': 'm',
+        'srs': 'EPSG:3857',
+        'layout': 'A4',
+        'dpi': 96,
+        'outputFilename': 'papua-new-guinea',
+        'layers': spec_layers,
+        'pages': [{
+            'center': [16384000.0, -703000.0],
+            'scale': 5000000,
+            'rotation': 0,
+            'mapTitle': 'Papua New Guinea',
+            'comment': '',
+        }],
+        'legends': [{
+            'name': f'png_layer_{_index}',
+            'classes': [{'icons': [f'http://localhost/geoserver/wms?request=GetLegendGraphic&layer={_index}']}],
+        } for _index in range(layers)],
+    }
+
+
+def legacy_rewrite_print_spec(data, method, access_token):
+    """The print spec rewrite of the proxy view before ``rewrite_print_spec``."""
+    json_data = json.loads(data)
+    logger.debug(json_data)
+    print(json_data)
+    contains_mapbox_req = 'layers' in json.loads(data) and any(
+        ['mapbox' in layer.get('baseURL', "") for layer in json_data.get('layers', []) if 'baseURL' in layer])
+    if method == "POST" and contains_mapbox_req:
+        for layer in json_data.get('layers', []):
+            if 'mapbox' in layer.get('baseURL', ""):
+                if 'customParams ' in layer:
+                    layer['customParams ']['access_token'] = access_token
+                else:
+                    layer['customParams '] = {'access_token': access_token}
+                    del layer['customParams ']
+                if 'customParams' in layer:
+                    layer['customParams']['access_token'] = access_token
+                else:
+                    layer['customParams'] = {'access_token': access_token}
+                if layer.get("type", "") == "xyz":
+                    layer["path_format"] = layer.get("path_format", "").split("?")[0]
+        data = json.dumps(json_data)
+    logger.debug(data)
+    print(data)
+    return data
+
+
+@benchmark('print_spec')
+def print_spec():
+    """Rewrite throughput of a large MapFish print spec."""
+    from django.conf import settings
+
+    from .printing import rewrite_print_spec
+
+    data = json.dumps(sample_print_spec())
+
+    def legacy():
+        # the replaced code printed the spec twice, to the uwsgi log in production
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_rewrite_print_spec(data, 'POST', settings.MAPBOX_ACCESS_TOKEN)
+
+    return [
+        ('parse twice and print', legacy),
+        ('single pass', lambda: rewrite_print_spec(data, 'POST')),
+    ]
+
+
+def legacy_serialize_map_config(data, sources):
+    """The serialization of ``convert`` before ``splice_mapbox_sources``: sources inlined in the config."""
+    from django.core.serializers.json import DjangoJSONEncoder
+    data = dict(data, map=dict(data['map'], sources=sources))
+    return json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+
+
+def serialize_map_config(data):
+    """The serialization of ``convert``: the sources spliced in pre-serialized."""
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    from .mapstore import MAPBOX_SOURCES_PLACEHOLDER, splice_mapbox_sources
+    data = dict(data, map=dict(data['map'], sources=MAPBOX_SOURCES_PLACEHOLDER))
+    return splice_mapbox_sources(json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True))
+
+
+@benchmark('convert')
+def convert():
+    """Serialization of a converted config with the Mapbox WMTS sources.
+
+    The replaced code also rebuilt the sources literal on every call, which
+    is not timed here: the gain shown is a lower bound.
+    """
+    from django.conf import settings
+
+    from .mapstore import mapbox_sources, mapbox_sources_json
+
+    data = sample_map_config()
+    sources = mapbox_sources(settings.MAPBOX_ACCESS_TOKEN)
+    mapbox_sources_json()
+    return [
+        ('sources serialized per call', lambda: legacy_serialize_map_config(data, sources)),
+        ('sources spliced', lambda: serialize_map_config(data)),
+    ]
+
+
+GEOAPP_VIEW_PATTERN = r'preview/(\d+)'
+GEOAPP_VIEW_REPLACE = r'\1/view#/'
+
+
+def sample_social_links(url='http://localhost/apps/preview/42'):
+    """The share links GeoNode gives the detail page of a GeoApp at ``url``."""
+    return [
+        {'label': 'Email', 'url': f'mailto:?subject=PNG&body={url}', 'css_class': 'email'},
+        {'label': 'Facebook', 'url': f'https://www.facebook.com/sharer.php?u={url}', 'css_class': 'fb'},
+        {'label': 'Twitter', 'url': f'https://twitter.com/share?url={url}', 'css_class': 'tw'},
+        {'label': 'LinkedIn', 'url': f'https://www.linkedin.com/shareArticle?mini=true&url={url}', 'css_class': 'in'},
+        {'label': 'Pinterest', 'url': f'https://www.pinterest.com/pin/create/button/?url={url}', 'css_class': 'pin'},
+        {'label': 'Link', 'url': url, 'css_class': 'link'},
+    ]
+
+
+def legacy_social_links_template():
+    """social_links.html as it was before ``url_transform``, with the regex_replace tag."""
+    from django.template import engines
+    from django.template.loader import get_template
+    source = get_template('social_links.html').template.source
+    source = source.replace(
+        "{{ social_link.url|url_transform:'geoapp_view' }}",
+        f"{{% regex_replace social_link.url '{GEOAPP_VIEW_PATTERN}' '{GEOAPP_VIEW_REPLACE}' %}}")
+    return engines['django'].from_string(source)
+
+
+@benchmark('social_links')
+def social_links():
+    """Render of the share links of a GeoApp detail page."""
+    from django.template.loader import get_template
+
+    context = {'resource': {'resource_type': 'geoapp'}, 'social_links': sample_social_links()}
+    legacy = legacy_social_links_template()
+    template = get_template('social_links.html')
+    return [
+        ('regex_replace', lambda: legacy.render(context)),
+        ('url_transform', lambda: template.render(context)),
+    ]
+
+
+METADATA_FORM_PREFIX = 'resource'
+
+
+def legacy_customize_form(form, hidden_fields):
+    """The metadata form ``__init__`` customizations before ``ResourceFormSpec``."""
+    from django.forms import HiddenInput
+    from django.utils.translation import ugettext_lazy as _
+
+    cols_to_exclude = [f for f in form.fields.keys() if f in form.Meta.exclude]
+    [form.fields.pop(_f) for _f in cols_to_exclude]
+    abstract = form.fields.get("abstract")
+    if abstract:
+        abstract.label = _('Description')
+
+    attribution = form.fields.get("attribution")
+    if attribution:
+        attribution.label = _('Source')
+        attribution.help_text = _('Who created the dataset?')
+    for field in hidden_fields:
+        hide_field = form.fields.get(field)
+        if hide_field:
+            hide_field.hidden = True
+            hide_field.widget = HiddenInput()
+
+    group = form.fields.get("group")
+    if group:
+        group.help_text = _('Who should have access to the data?')
+    constraints_other = form.fields.get("constraints_other")
+    if constraints_other:
+        constraints_other.label = _('Constraints / Caveats')
+
+    for field in form.fields:
+        help_text = form.fields[field].help_text
+        if help_text != '':
+            form.fields[field].widget.attrs.update(
+                {
+                    'class': 'has-external-popover',
+                    'data-content': help_text,
+                    'data-placement': 'right',
+                    'data-container': 'body',
+                    'data-html': 'true'})
+    return form
+
+
+def legacy_metadata_form(form_class):
+    """An instance of the patched ``form_class`` customized as before ``ResourceFormSpec``."""
+    from django.apps import apps
+    form = form_class.__new__(form_class)
+    super(form_class, form).__init__(prefix=METADATA_FORM_PREFIX)
+    return legacy_customize_form(form, apps.get_app_config('undp_png').hidden_metadata_fields())
+
+
+@benchmark('metadata_form')
+def metadata_form():
+    """Instantiation of the layer metadata edit form."""
+    from geonode.layers.forms import LayerForm
+    return [
+        ('customized per instance', lambda: legacy_metadata_form(LayerForm)),
+        ('ResourceFormSpec', lambda: LayerForm(prefix=METADATA_FORM_PREFIX)),
+    ]
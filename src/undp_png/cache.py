@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""Cache helpers for UNDP PNG.
+
+The aliases of ``settings.CACHES`` may be per process or shared by every
+worker, see ``settings.CACHE_BACKEND``; these helpers only rely on the
+``get``/``add``/``set``/``delete`` API common to all Django backends.
+
+@Date : 2026-10-18
+"""
+import logging
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Seconds a process may hold a recomputation lock before another one takes over
+COMPUTE_LOCK_TIMEOUT = 30
+# Seconds a process waits for another one to compute a missing value
+COMPUTE_WAIT = 5
+COMPUTE_POLL_INTERVAL = 0.05
+
+# Backends keeping their values inside the process, see ``is_shared_cache``
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias):
+    """Whether every worker reads and writes the same ``alias`` cache.
+
+    Versions bumped in a per process cache only reach the process that
+    bumped them, so anything relying on ``bump_version`` from a signal
+    needs a shared one.
+    """
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_CACHE_BACKENDS
+
+
+def get_version(alias, name):
+    """Current version of the ``name`` namespace of the ``alias`` cache.
+
+    Versions are timestamps so that an evicted counter never resurrects
+    values cached before the last ``bump_version``.
+    """
+    cache = caches[alias]
+    key = f'undp_png:version:{name}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(alias, name):
+    """Orphan every value cached in the ``name`` namespace of the ``alias`` cache."""
+    caches[alias].set(f'undp_png:version:{name}', time.time_ns(), None)
+
+
+def versioned_key(alias, name, *parts):
+    """Key of ``parts`` in the current version of the ``name`` namespace."""
+    return ':'.join(('undp_png', name, str(get_version(alias, name)), *(str(_p) for _p in parts)))
+
+
+def _store(cache, key, compute, timeout):
+    start = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - start
+    expires = None if timeout is None else time.time() + timeout
+    cache.set(key, (value, delta, expires), timeout)
+    return value
+
+
+def get_or_compute(key, compute, alias=DEFAULT_CACHE_ALIAS, timeout=DEFAULT_TIMEOUT, beta=1.0):
+    """Return the cached value of ``key``, calling ``compute`` on a miss without a stampede.
+
+    Only the process winning a lock recomputes a missing value; the others
+    wait up to COMPUTE_WAIT seconds for it. Values are also recomputed
+    before they expire, with a probability growing as the expiry nears and
+    with the time ``compute`` took, so that a hot key never expires for
+    every worker at once.
+    """
+    cache = caches[alias]
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    envelope = cache.get(key)
+    if envelope is not None:
+        value, delta, expires = envelope
+        if expires is None or time.time() - delta * beta * math.log(random.random() or 1e-12) < expires:
+            return value
+
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, True, COMPUTE_LOCK_TIMEOUT):
+        if envelope is not None:
+            # another process is already refreshing it
+            return envelope[0]
+        deadline = time.monotonic() + COMPUTE_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(COMPUTE_POLL_INTERVAL)
+            envelope = cache.get(key)
+            if envelope is not None:
+                return envelope[0]
+        logger.warning(f"Gave up waiting for {key}, computing it again.")
+        return _store(cache, key, compute, timeout)
+    try:
+        return _store(cache, key, compute, timeout)
+    finally:
+        cache.delete(lock_key)
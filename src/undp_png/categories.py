@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""Home page category counts for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .cache import bump_version, get_or_compute, versioned_key
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_CACHE_ALIAS = 'api-listings'
+
+CATEGORY_FIELDS = (
+    'category__gn_description',
+    'category__fa_class',
+    'category__description',
+    'category__identifier',
+)
+
+
+def visible_resources(user, queryset=None):
+    """The resources of ``queryset`` ``user`` may view, with the guardian permission join."""
+    from geonode.base.models import ResourceBase
+    from guardian.shortcuts import get_objects_for_user
+    return get_objects_for_user(
+        user, 'view_resourcebase', klass=ResourceBase if queryset is None else queryset, any_perm=False)
+
+
+def visible_category_counts(user):
+    """Count the resources of each category ``user`` may view."""
+    categories = visible_resources(user)\
+        .filter(category__isnull=False).values(*CATEGORY_FIELDS)\
+        .order_by('category__identifier')\
+        .annotate(count=Count('category'))
+    return list(categories)
+
+
+def permission_class(user):
+    """Name the set of users sharing the category counts of ``user``.
+
+    Anonymous users and superusers each form a single class; any other user
+    has object permissions of their own, so the class is the user and their
+    groups, and a change of membership lands in a new class.
+    """
+    if user is None or not user.is_authenticated:
+        return 'anonymous'
+    if user.is_superuser:
+        return 'superuser'
+    groups = ','.join(str(_pk) for _pk in sorted(user.groups.values_list('pk', flat=True)))
+    return f"user:{user.pk}:{hashlib.md5(groups.encode('utf-8')).hexdigest()[:12]}"
+
+
+def invalidate_category_counts(*args, **kwargs):
+    """Drop the cached category counts of every permission class."""
+    bump_version(CATEGORIES_CACHE_ALIAS, 'categories')
+
+
+def cached_category_counts(user):
+    """The category counts of ``user``, computed once per permission class and version."""
+    return get_or_compute(
+        versioned_key(CATEGORIES_CACHE_ALIAS, 'categories', permission_class(user)),
+        lambda: visible_category_counts(user),
+        alias=CATEGORIES_CACHE_ALIAS)
+
+
+def audience_counts(category_ids=None):
+    """Count the resources of each category per audience of CategoryResourceCount.
+
+    Returns a dict mapping ``(audience, category_id)`` to a count, covering
+    every category of ``category_ids`` (all categories when None).
+    """
+    from geonode.base.models import ResourceBase, TopicCategory
+
+    from .models import CategoryResourceCount
+
+    categories = TopicCategory.objects.all()
+    resources = ResourceBase.objects.filter(category__isnull=False)
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+        resources = resources.filter(category__in=category_ids)
+    audiences = (
+        (CategoryResourceCount.AUDIENCE_SUPERUSER, resources),
+        (CategoryResourceCount.AUDIENCE_ANONYMOUS, visible_resources(AnonymousUser(), resources)),
+    )
+    counts = {}
+    for audience, queryset in audiences:
+        for category_id in categories.values_list('pk', flat=True):
+            counts[(audience, category_id)] = 0
+        for row in queryset.order_by().values('category').annotate(count=Count('pk')):
+            counts[(audience, row['category'])] = row['count']
+    return counts
+
+
+def refresh_category_counts(category_ids):
+    """Recompute the CategoryResourceCount rows of ``category_ids``."""
+    from .models import CategoryResourceCount
+    counts = audience_counts(category_ids)
+    with transaction.atomic():
+        for (audience, category_id), count in counts.items():
+            CategoryResourceCount.objects.update_or_create(
+                audience=audience, category_id=category_id, defaults={'count': count})
+
+
+def rebuild_category_counts():
+    """Recompute every CategoryResourceCount row from scratch; returns the number of rows."""
+    from .models import CategoryResourceCount
+    counts = audience_counts()
+    with transaction.atomic():
+        CategoryResourceCount.objects.all().delete()
+        CategoryResourceCount.objects.bulk_create(
+            CategoryResourceCount(audience=audience, category_id=category_id, count=count)
+            for (audience, category_id), count in counts.items())
+    return len(counts)
+
+
+def _refresh_key(kind, pk):
+    return f'undp_png:categories:refresh:{kind}:{pk}'
+
+
+def schedule_category_counts_refresh(category_ids=(), resource_ids=()):
+    """Refresh the counts of ``category_ids`` and of the categories of ``resource_ids`` in Celery.
+
+    The task is queued once the current transaction commits, and only for the
+    categories and resources without a refresh already queued: every save
+    made before it starts, e.g. the permission rows of one ``set_permissions``,
+    is covered by the same task. It starts CATEGORY_COUNTS_REFRESH_DELAY
+    seconds later.
+    """
+    category_ids = {_pk for _pk in category_ids if _pk}
+    resource_ids = {_pk for _pk in resource_ids if _pk}
+    if not category_ids and not resource_ids:
+        return
+
+    def enqueue():
+        from .tasks import refresh_category_counts as _refresh_category_counts
+        cache = caches[CATEGORIES_CACHE_ALIAS]
+        delay = getattr(settings, 'CATEGORY_COUNTS_REFRESH_DELAY', 5)
+        # a refresh lost with its worker only holds the next ones back until the key expires
+        timeout = delay + 60
+        categories = [_pk for _pk in category_ids if cache.add(_refresh_key('category', _pk), True, timeout)]
+        resources = [_pk for _pk in resource_ids if cache.add(_refresh_key('resource', _pk), True, timeout)]
+        if categories or resources:
+            _refresh_category_counts.apply_async(args=(categories, resources), countdown=delay)
+
+    transaction.on_commit(enqueue)
+
+
+def refresh_queued_category_counts(category_ids, resource_ids):
+    """Refresh the counts queued by ``schedule_category_counts_refresh``."""
+    from geonode.base.models import ResourceBase
+    cache = caches[CATEGORIES_CACHE_ALIAS]
+    # later changes queue a new refresh from now on
+    cache.delete_many([_refresh_key('category', _pk) for _pk in category_ids] +
+                      [_refresh_key('resource', _pk) for _pk in resource_ids])
+    category_ids = set(category_ids)
+    if resource_ids:
+        category_ids.update(ResourceBase.objects.filter(
+            pk__in=resource_ids, category__isnull=False).values_list('category_id', flat=True))
+    if category_ids:
+        refresh_category_counts(category_ids)
+
+
+def category_counts(user):
+    """The category counts of ``user`` for the home page.
+
+    Anonymous users and superusers read the materialized CategoryResourceCount
+    rows; any other user goes through ``cached_category_counts``.
+    """
+    from .models import CategoryResourceCount
+    audience = permission_class(user)
+    if audience not in (CategoryResourceCount.AUDIENCE_ANONYMOUS, CategoryResourceCount.AUDIENCE_SUPERUSER):
+        return cached_category_counts(user)
+    rows = list(CategoryResourceCount.objects.filter(audience=audience)
+                .select_related('category').order_by('category__identifier'))
+    if not rows:
+        # not built yet, see the rebuild_category_counts management command
+        return cached_category_counts(user)
+    return [
+        {
+            'category__gn_description': _row.category.gn_description,
+            'category__fa_class': _row.category.fa_class,
+            'category__description': _row.category.description,
+            'category__identifier': _row.category.identifier,
+            'count': _row.count,
+        }
+        for _row in rows if _row.count
+    ]
@@ -32,6 +32,10 @@ app = Celery('undp_png')
 app.config_from_object('django.conf:settings', namespace="CELERY")
 app.autodiscover_tasks()
 
+# Celery signals are global: this also instruments the geonode app tasks
+from undp_png.metrics import connect_task_metrics  # noqa
+connect_task_metrics()
+
 
 @app.task(
     bind=True,
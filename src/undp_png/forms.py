@@ -6,7 +6,7 @@
 """
 import logging
 
-from django.forms import ModelForm
+from django.forms import HiddenInput, ModelForm
 
 from .models import CuratedThumbnailLarge
 
@@ -17,3 +17,61 @@ class CuratedThumbnailForm(ModelForm):
     class Meta:
         model = CuratedThumbnailLarge
         fields = ['img']
+
+
+def popover_attrs(help_text):
+    """Widget attributes showing ``help_text`` in an external popover."""
+    return {
+        'class': 'has-external-popover',
+        'data-content': help_text,
+        'data-placement': 'right',
+        'data-container': 'body',
+        'data-html': 'true'}
+
+
+class ResourceFormSpec:
+    """Field customizations of a resource metadata form, computed once per form class.
+
+    :param form_class: form whose ``base_fields`` the spec is computed from
+    :param exclude: names of the fields to remove
+    :param labels: field name to label overrides
+    :param help_texts: field name to help text overrides
+    :param hidden: names of the fields rendered with a HiddenInput
+    """
+
+    def __init__(self, form_class, exclude=(), labels=None, help_texts=None, hidden=()):
+        self.exclude = frozenset(exclude)
+        self.overrides = {}
+        for attr, values in (('label', labels or {}), ('help_text', help_texts or {})):
+            for name, value in values.items():
+                self.overrides.setdefault(name, []).append((attr, value))
+        self.hidden = frozenset(hidden) - self.exclude
+        # help texts a form instance starts with, to spot those its __init__ changes
+        self.base_help_texts = {}
+        self.popovers = {}
+        for name, field in form_class.base_fields.items():
+            if name in self.exclude:
+                continue
+            self.base_help_texts[name] = field.help_text
+            help_text = dict(self.overrides.get(name, ())).get('help_text', field.help_text)
+            if help_text != '':
+                self.popovers[name] = popover_attrs(help_text)
+
+    def apply(self, form):
+        """Customize the fields of a freshly initialized ``form``."""
+        fields = form.fields
+        for name in self.exclude.intersection(fields):
+            del fields[name]
+        for name, field in fields.items():
+            static = name in self.base_help_texts and field.help_text is self.base_help_texts[name]
+            for attr, value in self.overrides.get(name, ()):
+                setattr(field, attr, value)
+            if name in self.hidden:
+                field.hidden = True
+                field.widget = HiddenInput()
+            if static:
+                popover = self.popovers.get(name)
+            else:
+                popover = popover_attrs(field.help_text) if field.help_text != '' else None
+            if popover:
+                field.widget.attrs.update(popover)
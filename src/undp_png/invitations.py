@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Batched invitation sending for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import logging
+import smtplib
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+logger = logging.getLogger(__name__)
+
+INVITATION_EMAIL_TEMPLATE = 'invitations/email/email_invite'
+
+# Errors after which a later attempt may succeed; anything else is logged and skipped
+TRANSIENT_SMTP_ERRORS = (
+    smtplib.SMTPConnectError,
+    smtplib.SMTPServerDisconnected,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def is_transient_smtp_error(exc):
+    if isinstance(exc, TRANSIENT_SMTP_ERRORS):
+        return True
+    # 4xx replies are temporary failures, e.g. greylisting or rate limiting
+    return isinstance(exc, smtplib.SMTPResponseException) and 400 <= exc.smtp_code < 500
+
+
+def create_invitations(emails, inviter):
+    """Persist an Invitation per email with a single insert."""
+    from invitations.utils import get_invitation_model
+    Invitation = get_invitation_model()
+    return Invitation.objects.bulk_create(
+        Invitation(email=_email, key=get_random_string(64).lower(), inviter=inviter)
+        for _email in emails)
+
+
+def schedule_invitations(invitation_ids):
+    """Queue the sending of ``invitation_ids``, INVITATION_BATCH_SIZE per task, once the transaction commits."""
+    from .tasks import send_invitations
+    batch_size = getattr(settings, 'INVITATION_BATCH_SIZE', 50)
+    invitation_ids = list(invitation_ids)
+    for start in range(0, len(invitation_ids), batch_size):
+        batch = invitation_ids[start:start + batch_size]
+        transaction.on_commit(lambda batch=batch: send_invitations.apply_async(args=(batch,)))
+
+
+def send_invitations(invitation_ids):
+    """Send the unsent invitations of ``invitation_ids`` over one SMTP connection.
+
+    Transient SMTP errors are raised so the batch can be retried; invitations
+    already sent are skipped on the next attempt. Returns the number sent.
+    """
+    from django.contrib.sites.models import Site
+    from invitations import signals
+    from invitations.adapters import get_invitations_adapter
+    from invitations.utils import get_invitation_model
+
+    Invitation = get_invitation_model()
+    invitations = list(Invitation.objects.filter(
+        pk__in=invitation_ids, sent__isnull=True).select_related('inviter'))
+    if not invitations:
+        return 0
+
+    adapter = get_invitations_adapter()
+    site_name = Site.objects.get_current().name
+    sent = 0
+    with get_connection() as connection:
+        for invitation in invitations:
+            invite_url = urljoin(
+                settings.SITEURL, reverse('geonode.invitations:accept-invite', args=[invitation.key]))
+            message = adapter.render_mail(INVITATION_EMAIL_TEMPLATE, invitation.email, {
+                'invite_url': invite_url,
+                'site_name': site_name,
+                'email': invitation.email,
+                'key': invitation.key,
+                'inviter': invitation.inviter,
+            })
+            message.connection = connection
+            try:
+                message.send()
+            except Exception as e:
+                if is_transient_smtp_error(e):
+                    raise
+                logger.exception(e)
+                continue
+            invitation.sent = timezone.now()
+            Invitation.objects.filter(pk=invitation.pk).update(sent=invitation.sent)
+            signals.invite_url_sent.send(
+                sender=Invitation,
+                instance=invitation,
+                invite_url_sent=invite_url,
+                inviter=invitation.inviter)
+            sent += 1
+    return sent
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""Run the UNDP PNG benchmarks.
+
+@Date : 2026-10-18
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from undp_png.benchmarks import BENCHMARKS, run
+
+
+class Command(BaseCommand):
+    help = "Time the optimized hot paths against the implementations they replaced."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help=f"Benchmarks to run, all by default: {', '.join(sorted(BENCHMARKS))}.")
+        parser.add_argument(
+            '--number', type=int, default=100,
+            help="Calls per timing.")
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help="Timings per variant, the best one is reported.")
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}.")
+        for name in names:
+            results = run(name, number=options['number'], repeat=options['repeat'])
+            baseline = results[0][1]
+            for label, seconds in results:
+                self.stdout.write(
+                    f"{name}\t{label}\t{seconds * 1000:.3f} ms\t{baseline / seconds if seconds else 0:.2f}x")
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Print the Celery queues of a celery-cmd worker profile.
+
+@Date : 2026-10-18
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from undp_png.queues import profile_queues
+
+
+class Command(BaseCommand):
+    help = "Print the comma separated queues consumed by a worker profile, as passed to 'celery worker -Q'."
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', help="A worker profile of UNDP_PNG_WORKER_PROFILES, or 'default'.")
+
+    def handle(self, *args, **options):
+        try:
+            queues = profile_queues(options['profile'])
+        except KeyError:
+            raise CommandError(f"Unknown worker profile {options['profile']}.")
+        if not queues:
+            raise CommandError(f"The {options['profile']} worker profile consumes no declared queue.")
+        self.stdout.write(','.join(queues))
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Backfill the stored curated thumbnail urls.
+
+@Date : 2026-10-18
+"""
+from django.core.management.base import BaseCommand
+
+from geonode.base.models import CuratedThumbnail
+from undp_png.models import CuratedThumbnailLarge, mirror_curated_thumbnail, schedule_thumbnail_derivation
+
+
+class Command(BaseCommand):
+    help = ("Mirror GeoNode curated thumbnails as CuratedThumbnailLarge and queue the derivation of "
+            "every CuratedThumbnailLarge without a stored url, e.g. after an upgrade.")
+
+    def handle(self, *args, **options):
+        mirrored = 0
+        for curated in CuratedThumbnail.objects.filter(resource__curatedthumbnaillarge__isnull=True).iterator():
+            if mirror_curated_thumbnail(curated) is not None:
+                mirrored += 1
+        queued = 0
+        for pk in CuratedThumbnailLarge.objects.filter(img_thumbnail_url='').values_list('pk', flat=True):
+            schedule_thumbnail_derivation(pk)
+            queued += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Mirrored {mirrored} curated thumbnails, queued {queued} derivations."))
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the materialized home page category counts.
+
+@Date : 2026-10-18
+"""
+from django.core.management.base import BaseCommand
+
+from undp_png.categories import invalidate_category_counts, rebuild_category_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute every CategoryResourceCount row, e.g. after a bulk import or a migration."
+
+    def handle(self, *args, **options):
+        rows = rebuild_category_counts()
+        invalidate_category_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} category counts."))
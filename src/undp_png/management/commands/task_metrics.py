@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Report the recorded Celery task metrics.
+
+@Date : 2026-10-18
+"""
+from django.core.management.base import BaseCommand
+
+from undp_png.metrics import FAILURES, INF, METRICS, prometheus_text
+
+
+class Command(BaseCommand):
+    help = "Summarize the queue wait, run time, RSS delta and result size recorded per Celery task."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prometheus', action='store_true',
+            help="Print the metrics in the Prometheus text format.")
+        parser.add_argument(
+            '--reset', action='store_true',
+            help="Delete every recorded metric.")
+
+    def handle(self, *args, **options):
+        from undp_png.models import TaskMetric
+
+        if options['reset']:
+            deleted, _ = TaskMetric.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} task metric rows."))
+            return
+        if options['prometheus']:
+            self.stdout.write(prometheus_text(), ending='')
+            return
+
+        totals = {}
+        for row in TaskMetric.objects.filter(le=INF):
+            totals.setdefault(row.task, {})[row.metric] = row
+        columns = ('runs', 'failures', *(f'avg {_m}' for _m in METRICS))
+        self.stdout.write('\t'.join(('task', *columns)))
+        for task in sorted(totals):
+            metrics = totals[task]
+            runtime = metrics.get('runtime')
+            values = [
+                runtime.count if runtime else 0,
+                metrics[FAILURES].count if FAILURES in metrics else 0,
+            ]
+            for metric in METRICS:
+                row = metrics.get(metric)
+                values.append(f'{row.total / row.count:.3f}' if row and row.count else '-')
+            self.stdout.write('\t'.join(str(_v) for _v in (task, *values)))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""MapStore2 configuration helpers for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import functools
+import hashlib
+import json
+import math
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .cache import bump_version, get_version, is_shared_cache
+
+# Stands for the Mapbox WMTS sources in the converted config until they are spliced in
+MAPBOX_SOURCES_PLACEHOLDER = '__undp_png_mapbox_sources__'
+
+MAPSTORE_CACHE_ALIAS = 'mapstore'
+
+EARTH_RADIUS = 6378137
+# OGC standardized rendering pixel size, in metres
+PIXEL_SIZE = 0.00028
+
+
+def google3857_tile_matrices(levels=24, tile_size=256):
+    """The GoogleMapsCompatible TileMatrix list for zoom levels 0 to ``levels - 1``."""
+    origin = math.pi * EARTH_RADIUS
+    scale = 2 * origin / tile_size / PIXEL_SIZE
+    top_left = f'{-origin:.12g} {origin:.12g}'
+    matrices = []
+    for zoom in range(levels):
+        size = str(2 ** zoom)
+        matrices.append({
+            'MatrixHeight': size,
+            'MatrixWidth': size,
+            'ScaleDenominator': f'{scale / 2 ** zoom:.12g}',
+            'TileHeight': str(tile_size),
+            'TileWidth': str(tile_size),
+            'TopLeftCorner': top_left,
+            'ows:Identifier': str(zoom)
+        })
+    return matrices
+
+
+def mapbox_sources(access_token):
+    """The MapStore2 ``sources`` declaring the Mapbox streets WMTS service."""
+    return {
+        f"https://api.mapbox.com/styles/v1/mapbox/streets-v11/wmts?access_token={access_token}": {
+            "tileMatrixSet": {
+                "google3857": {
+                    'ows:Identifier': 'google3857',
+                    'ows:BoundingBox': {
+                        "$": {
+                            "crs": 'urn:ogc:def:crs:EPSG:6.18.3:3857'
+                        },
+                        'ows:LowerCorner': '977650 5838030',
+                        'ows:UpperCorner': '1913530 6281290'
+                    },
+                    'ows:SupportedCRS': 'urn:ogc:def:crs:EPSG:6.18.3:3857',
+                    "WellKnownScaleSet": 'urn:ogc:def:wkss:OGC:1.0:GoogleMapsCompatible',
+                    "TileMatrix": google3857_tile_matrices()
+                },
+            }
+        }
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def mapbox_sources_json():
+    """The Mapbox ``sources`` serialized once, as ``convert`` would serialize them."""
+    return json.dumps(mapbox_sources(settings.MAPBOX_ACCESS_TOKEN), cls=DjangoJSONEncoder, sort_keys=True)
+
+
+def splice_mapbox_sources(json_str):
+    """Replace the sources placeholder of a serialized config with the Mapbox sources."""
+    return json_str.replace(f'"{MAPBOX_SOURCES_PLACEHOLDER}"', mapbox_sources_json(), 1)
+
+
+def unsafe_chars_escaper(unsafe_chars):
+    """Build a function replacing every key of ``unsafe_chars`` in a single pass.
+
+    Single characters go through a ``str.translate`` table; longer keys fall
+    back to one alternation regex, longest key first.
+    """
+    unsafe_chars = dict(unsafe_chars)
+    if all(len(_c) == 1 for _c in unsafe_chars):
+        table = str.maketrans(unsafe_chars)
+        return lambda json_str: json_str.translate(table)
+    pattern = re.compile('|'.join(re.escape(_c) for _c in sorted(unsafe_chars, key=len, reverse=True)))
+    return lambda json_str: pattern.sub(lambda match: unsafe_chars[match.group(0)], json_str)
+
+
+@functools.lru_cache(maxsize=None)
+def baselayers_version():
+    """Fingerprint of MAPSTORE_BASELAYERS, so a new background set misses old configs."""
+    baselayers = json.dumps(
+        getattr(settings, 'MAPSTORE_BASELAYERS', []), cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.md5(baselayers.encode('utf-8')).hexdigest()[:12]
+
+
+def map_config_version(map_id):
+    """Current version of the cached configs of a map.
+
+    The MapStoreResource last update is read from the database, so a
+    process missing a ``invalidate_map_config`` still misses a stale config;
+    the version bump covers what it does not, e.g. permission changes.
+    """
+    from mapstore2_adapter.api.models import MapStoreResource
+    last_update = MapStoreResource.objects.filter(id=map_id).values_list('last_update', flat=True).first()
+    last_update = last_update.timestamp() if last_update else 0
+    return f"{get_version(MAPSTORE_CACHE_ALIAS, f'mapstore:map:{map_id}')}:{last_update:.6f}"
+
+
+def invalidate_map_config(map_id):
+    """Drop every cached viewer config of a map."""
+    bump_version(MAPSTORE_CACHE_ALIAS, f'mapstore:map:{map_id}')
+
+
+def map_config_cache_enabled():
+    """Map configs are only cached where every process sees ``invalidate_map_config``."""
+    return is_shared_cache(MAPSTORE_CACHE_ALIAS)
+
+
+def map_config_cache_key(map_id, user, viewer):
+    """Key of the config ``viewer`` converts to for a map as seen by ``user``.
+
+    ``viewer`` carries the layers of the request, added layers and access
+    tokens included, so only identical requests share a config. The user
+    part is the ``permission_class`` of ``user``, so joining or leaving a
+    group misses the configs cached with the old canEdit and canDelete.
+    """
+    from .categories import permission_class
+    fingerprint = permission_class(user)
+    if not isinstance(viewer, str):
+        viewer = json.dumps(viewer, cls=DjangoJSONEncoder, sort_keys=True)
+    viewer_hash = hashlib.md5(viewer.encode('utf-8')).hexdigest()[:12]
+    return (f'undp_png:mapstore:config:{map_id}:{map_config_version(map_id)}:'
+            f'{fingerprint}:{viewer_hash}:{baselayers_version()}')
+
+
+def get_cached_map_config(cache_key):
+    return caches[MAPSTORE_CACHE_ALIAS].get(cache_key)
+
+
+def set_cached_map_config(cache_key, json_str):
+    caches[MAPSTORE_CACHE_ALIAS].set(cache_key, json_str)
+
+
+def resource_permissions(request, resource):
+    """Resolve ``(can_edit, can_delete)`` of the requesting user on ``resource``.
+
+    Both permissions come from a single guardian lookup of the user's
+    permissions on the underlying ResourceBase.
+    """
+    user = getattr(request, 'user', None)
+    if resource is None or user is None:
+        return False, False
+    if user.is_authenticated and not user.is_active:
+        return False, False
+    from guardian.core import ObjectPermissionChecker
+    perms = ObjectPermissionChecker(user).get_perms(resource.get_self_resource())
+    return 'change_resourcebase' in perms, 'delete_resourcebase' in perms
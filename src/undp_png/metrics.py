@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Celery task metrics for UNDP PNG.
+
+Queue wait, run time, RSS delta and result size of every task are recorded
+as cumulative histograms in TaskMetric rows, see ``prometheus_text``.
+Observations are summed in the worker process and written every
+TASK_METRICS_FLUSH_INTERVAL seconds, so tasks never wait on the rows.
+
+@Date : 2026-10-18
+"""
+import json
+import logging
+import os
+import resource
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_HEADER = 'undp_png_published'
+
+INF = float('inf')
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, INF)
+BYTES_BUCKETS = (0, 2 ** 10, 2 ** 14, 2 ** 17, 2 ** 20, 2 ** 23, 2 ** 26, 2 ** 28, INF)
+
+# metric name: (histogram buckets, Prometheus name, help)
+METRICS = {
+    'queue_wait': (SECONDS_BUCKETS, 'undp_png_task_queue_wait_seconds',
+                   'Time between publishing (or ETA) and the start of a task.'),
+    'runtime': (SECONDS_BUCKETS, 'undp_png_task_runtime_seconds', 'Run time of a task.'),
+    'rss_delta': (BYTES_BUCKETS, 'undp_png_task_rss_delta_bytes', 'Growth of the worker RSS while running a task.'),
+    'result_size': (BYTES_BUCKETS, 'undp_png_task_result_bytes', 'Size of the JSON serialized task result.'),
+}
+FAILURES = 'failures'
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_running = {}
+_initialized = set()
+# (task name, metric): {bucket upper bound: observations}, the +Inf bucket also holds the sum
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def task_metrics_enabled():
+    return getattr(settings, 'TASK_METRICS_ENABLED', True)
+
+
+def current_rss():
+    """Resident set size of the current process in bytes."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # peak RSS, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _ensure_rows(task_name, metric, buckets):
+    from .models import TaskMetric
+    if (task_name, metric) in _initialized:
+        return
+    TaskMetric.objects.bulk_create(
+        [TaskMetric(task=task_name, metric=metric, le=_le) for _le in buckets],
+        ignore_conflicts=True)
+    _initialized.add((task_name, metric))
+
+
+def observe(task_name, metric, value):
+    """Add ``value`` to the ``metric`` histogram of ``task_name``, see ``flush_metrics``."""
+    buckets = METRICS[metric][0] if metric in METRICS else (INF,)
+    with _pending_lock:
+        pending = _pending.setdefault((task_name, metric), {})
+        for le in buckets:
+            if le != INF and value <= le:
+                pending[le] = pending.get(le, 0) + 1
+        count, total = pending.get(INF, (0, 0))
+        pending[INF] = (count + 1, total + value)
+
+
+def _write(task_name, metric, pending):
+    from .models import TaskMetric
+    buckets = METRICS[metric][0] if metric in METRICS else (INF,)
+    count, total = pending.pop(INF)
+    for _attempt in range(2):
+        _ensure_rows(task_name, metric, buckets)
+        rows = TaskMetric.objects.filter(task=task_name, metric=metric)
+        if rows.filter(le=INF).update(count=F('count') + count, total=F('total') + total):
+            for le, le_count in pending.items():
+                rows.filter(le=le).update(count=F('count') + le_count)
+            return
+        # rows were reset by another process
+        _initialized.discard((task_name, metric))
+
+
+def flush_metrics(force=False):
+    """Write the observations of this process to the TaskMetric rows.
+
+    Unless ``force`` is set, they are written at most once per
+    TASK_METRICS_FLUSH_INTERVAL seconds.
+    """
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < getattr(settings, 'TASK_METRICS_FLUSH_INTERVAL', 60):
+        return
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = now
+    for (task_name, metric), histogram in pending.items():
+        try:
+            _write(task_name, metric, histogram)
+        except Exception as e:
+            logger.exception(e)
+
+
+def on_before_task_publish(sender=None, headers=None, **kwargs):
+    if headers is not None and task_metrics_enabled():
+        headers[PUBLISHED_HEADER] = time.time()
+
+
+def on_task_prerun(sender=None, task_id=None, task=None, **kwargs):
+    if not task_metrics_enabled():
+        return
+    now = time.time()
+    _running[task_id] = (now, current_rss())
+    try:
+        published = getattr(task.request, PUBLISHED_HEADER, None)
+        eta = getattr(task.request, 'eta', None)
+        if eta:
+            from dateutil.parser import parse
+            published = max(published or 0, parse(eta).timestamp() if isinstance(eta, str) else eta.timestamp())
+        if published:
+            observe(task.name, 'queue_wait', max(now - published, 0))
+    except Exception as e:
+        logger.exception(e)
+
+
+def on_task_postrun(sender=None, task_id=None, task=None, retval=None, **kwargs):
+    started = _running.pop(task_id, None)
+    if started is None or not task_metrics_enabled():
+        return
+    start, rss = started
+    try:
+        observe(task.name, 'runtime', time.time() - start)
+        observe(task.name, 'rss_delta', max(current_rss() - rss, 0))
+        observe(task.name, 'result_size', len(json.dumps(retval, default=str)) if retval is not None else 0)
+    except Exception as e:
+        logger.exception(e)
+    flush_metrics()
+
+
+def on_task_failure(sender=None, task_id=None, **kwargs):
+    if sender is None or not task_metrics_enabled():
+        return
+    try:
+        observe(sender.name, FAILURES, 1)
+    except Exception as e:
+        logger.exception(e)
+
+
+def on_worker_process_shutdown(**kwargs):
+    if task_metrics_enabled():
+        flush_metrics(force=True)
+
+
+def connect_task_metrics():
+    """Connect the metric hooks to the Celery signals; called when the Celery app is created."""
+    from celery import signals
+    signals.before_task_publish.connect(on_before_task_publish, weak=False, dispatch_uid='undp_png_metrics_publish')
+    signals.task_prerun.connect(on_task_prerun, weak=False, dispatch_uid='undp_png_metrics_prerun')
+    signals.task_postrun.connect(on_task_postrun, weak=False, dispatch_uid='undp_png_metrics_postrun')
+    signals.task_failure.connect(on_task_failure, weak=False, dispatch_uid='undp_png_metrics_failure')
+    signals.worker_process_shutdown.connect(
+        on_worker_process_shutdown, weak=False, dispatch_uid='undp_png_metrics_process_shutdown')
+    signals.worker_shutdown.connect(
+        on_worker_process_shutdown, weak=False, dispatch_uid='undp_png_metrics_shutdown')
+
+
+def _format_le(le):
+    return '+Inf' if le == INF else f'{le:g}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text():
+    """All task metrics in the Prometheus text exposition format."""
+    from .models import TaskMetric
+    rows = {}
+    for row in TaskMetric.objects.order_by('metric', 'task', 'le'):
+        rows.setdefault(row.metric, []).append(row)
+
+    lines = []
+    for metric, (_buckets, name, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for row in rows.get(metric, ()):
+            task = _escape(row.task)
+            lines.append(f'{name}_bucket{{task="{task}",le="{_format_le(row.le)}"}} {row.count}')
+            if row.le == INF:
+                lines.append(f'{name}_sum{{task="{task}"}} {row.total}')
+                lines.append(f'{name}_count{{task="{task}"}} {row.count}')
+    lines.append('# HELP undp_png_task_failures_total Tasks which raised an exception.')
+    lines.append('# TYPE undp_png_task_failures_total counter')
+    for row in rows.get(FAILURES, ()):
+        lines.append(f'undp_png_task_failures_total{{task="{_escape(row.task)}"}} {row.count}')
+    return '\n'.join(lines) + '\n'
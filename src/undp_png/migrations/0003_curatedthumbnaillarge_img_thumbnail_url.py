@@ -0,0 +1,18 @@
+# Generated by Django 2.2.24 on 2026-10-18 10:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('undp_png', '0002_printjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curatedthumbnaillarge',
+            name='img_thumbnail_url',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.24 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('undp_png', '0003_curatedthumbnaillarge_img_thumbnail_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curatedthumbnaillarge',
+            name='img_srcset',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='curatedthumbnaillarge',
+            name='img_thumbnail_generated',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
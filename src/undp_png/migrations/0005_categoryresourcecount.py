@@ -0,0 +1,28 @@
+# Generated by Django 2.2.24 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0066_auto_20220223_1548'),
+        ('undp_png', '0004_curatedthumbnaillarge_derivation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryResourceCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audience', models.CharField(choices=[('anonymous', 'Anonymous'), ('superuser', 'Superuser')], max_length=16)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.TopicCategory')),
+            ],
+            options={
+                'unique_together': {('audience', 'category')},
+            },
+        ),
+    ]
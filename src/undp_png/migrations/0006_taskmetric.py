@@ -0,0 +1,27 @@
+# Generated by Django 2.2.24 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('undp_png', '0005_categoryresourcecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskMetric',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.CharField(max_length=255)),
+                ('metric', models.CharField(max_length=32)),
+                ('le', models.FloatField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('task', 'metric', 'le')},
+            },
+        ),
+    ]
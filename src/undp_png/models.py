@@ -6,17 +6,24 @@
 """
 import logging
 import os
+import uuid
 
 from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage as storage
-from django.db import models
-from geonode.base.models import ResourceBase
+from django.db import models, transaction
+from geonode.base.models import ResourceBase, TopicCategory
+from imagekit import ImageSpec
 from imagekit.cachefiles.backends import Simple
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 
 logger = logging.getLogger(__name__)
 
+# storage directory of the srcset variants of the curated thumbnails, named {pk}_{width}.{format}
+DERIVED_THUMBNAILS_DIR = 'curated_thumbs/derived'
+
 
 class CuratedThumbnailLarge(models.Model):
     resource = models.OneToOneField(ResourceBase, on_delete=models.CASCADE)
@@ -29,8 +36,27 @@ class CuratedThumbnailLarge(models.Model):
                                    format='PNG',
                                    options={'quality': 60})
 
-    @property
-    def thumbnail_url(self):
+    # resolved url of img_thumbnail, set by the derivation task and reset whenever img changes
+    img_thumbnail_url = models.CharField(max_length=255, blank=True, default='')
+    # responsive variants of img as an html srcset, see CURATED_THUMBNAIL_SRCSET_WIDTHS
+    img_srcset = models.TextField(blank=True, default='')
+    img_thumbnail_generated = models.DateTimeField(null=True, blank=True)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._img_name = self.img.name
+
+    def save(self, *args, **kwargs):
+        if self.img.name != self._img_name:
+            self.img_thumbnail_url = ''
+            self.img_srcset = ''
+            self.img_thumbnail_generated = None
+        super().save(*args, **kwargs)
+        self._img_name = self.img.name
+
+    def refresh_thumbnail_url(self):
+        """Generate img_thumbnail on storage and return its url."""
+        url = ''
         try:
             if not Simple()._exists(self.img_thumbnail):
                 Simple().generate(self.img_thumbnail, force=True)
@@ -39,7 +65,145 @@ class CuratedThumbnailLarge(models.Model):
             _upload_path = os.path.join(os.path.dirname(upload_path), actual_name)
             if not os.path.exists(_upload_path):
                 os.rename(upload_path, _upload_path)
-            return self.img_thumbnail.url
+            url = self.img_thumbnail.url
         except Exception as e:
             logger.exception(e)
-        return ''
+        self.img_thumbnail_url = url
+        return url
+
+    def derive_srcset(self):
+        """Render the CURATED_THUMBNAIL_SRCSET_WIDTHS variants of img and return their srcset."""
+        widths = getattr(settings, 'CURATED_THUMBNAIL_SRCSET_WIDTHS', ())
+        image_format = getattr(settings, 'CURATED_THUMBNAIL_SRCSET_FORMAT', 'WEBP')
+        ratio = (settings.THUMBNAIL_GENERATOR_DEFAULT_SIZE.get("height", 350) /
+                 settings.THUMBNAIL_GENERATOR_DEFAULT_SIZE.get("width", 420))
+        srcset = []
+        for width in widths:
+            spec = ImageSpec(source=self.img)
+            spec.processors = [ResizeToFill(width, round(width * ratio))]
+            spec.format = image_format
+            spec.options = {'quality': 60}
+            name = f"{DERIVED_THUMBNAILS_DIR}/{self.pk}_{width}.{image_format.lower()}"
+            if storage.exists(name):
+                storage.delete(name)
+            name = storage.save(name, ContentFile(spec.generate().read()))
+            srcset.append(f"{storage.url(name)} {width}w")
+        self.img_srcset = ', '.join(srcset)
+        return self.img_srcset
+
+    @property
+    def thumbnail_url(self):
+        """The derived thumbnail url, '' until the derivation task has run.
+
+        Rows saved before the task existed are derived by the
+        derive_curated_thumbnails management command.
+        """
+        return self.img_thumbnail_url
+
+
+def mirror_curated_thumbnail(curated):
+    """Create the CuratedThumbnailLarge of a resource from its GeoNode CuratedThumbnail.
+
+    Listings only read the stored url of CuratedThumbnailLarge, so a
+    resource curated through GeoNode gets one from the same image; an
+    existing CuratedThumbnailLarge is left untouched. Returns the created
+    row or None.
+    """
+    if not curated.img or CuratedThumbnailLarge.objects.filter(resource_id=curated.resource_id).exists():
+        return None
+    return CuratedThumbnailLarge.objects.create(resource_id=curated.resource_id, img=curated.img.name)
+
+
+def delete_derived_thumbnails(pk):
+    """Delete the srcset variants stored for the curated thumbnail ``pk``.
+
+    img is left alone, a mirrored GeoNode CuratedThumbnail may share it.
+    """
+    try:
+        _dirs, files = storage.listdir(DERIVED_THUMBNAILS_DIR)
+    except FileNotFoundError:
+        return
+    prefix = f"{pk}_"
+    for name in files:
+        if name.startswith(prefix):
+            storage.delete(f"{DERIVED_THUMBNAILS_DIR}/{name}")
+
+
+def schedule_thumbnail_derivation(pk, force=False):
+    """Queue the derivation of a curated thumbnail.
+
+    Unless ``force`` is set, a thumbnail is queued at most once per
+    THUMBNAIL_DERIVATION_LOCK seconds so that repeated backfills do not
+    flood the broker.
+    """
+    cache = caches['thumbnails']
+    key = f'undp_png:thumbnails:derive:{pk}'
+    timeout = getattr(settings, 'THUMBNAIL_DERIVATION_LOCK', 600)
+    if force:
+        cache.set(key, True, timeout)
+    elif not cache.add(key, True, timeout):
+        return
+    from .tasks import derive_curated_thumbnail
+    transaction.on_commit(lambda: derive_curated_thumbnail.apply_async(args=(pk,)))
+
+
+class PrintJob(models.Model):
+    """A MapFish print request rendered asynchronously by Celery."""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILURE = 'failure'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCESS, 'Success'),
+        (STATUS_FAILURE, 'Failure'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # MapFish create.json answer on success, error message on failure
+    result = models.TextField(blank=True, default='')
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class CategoryResourceCount(models.Model):
+    """Number of resources of a category visible to an audience, kept up to date by signals."""
+    AUDIENCE_ANONYMOUS = 'anonymous'
+    AUDIENCE_SUPERUSER = 'superuser'
+    AUDIENCE_CHOICES = (
+        (AUDIENCE_ANONYMOUS, 'Anonymous'),
+        (AUDIENCE_SUPERUSER, 'Superuser'),
+    )
+
+    audience = models.CharField(max_length=16, choices=AUDIENCE_CHOICES)
+    category = models.ForeignKey(TopicCategory, on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('audience', 'category')
+
+    def __str__(self):
+        return f"{self.category} ({self.audience}): {self.count}"
+
+
+class TaskMetric(models.Model):
+    """A cumulative histogram bucket of a Celery task metric, see ``undp_png.metrics``."""
+    task = models.CharField(max_length=255)
+    metric = models.CharField(max_length=32)
+    # upper bound of the bucket, infinity for the bucket holding the count and sum
+    le = models.FloatField()
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('task', 'metric', 'le')
+
+    def __str__(self):
+        return f"{self.task} {self.metric} le={self.le}: {self.count}"
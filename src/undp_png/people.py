@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Bulk user helpers for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import logging
+
+from django.contrib.auth import get_user_model
+
+logger = logging.getLogger(__name__)
+
+
+def registered_members_group():
+    """The registered members GroupProfile new users join, None when auto-assignment is off."""
+    from geonode.groups.conf import settings as groups_settings
+    from geonode.groups.models import GroupProfile
+    if not groups_settings.AUTO_ASSIGN_REGISTERED_MEMBERS_TO_REGISTERED_MEMBERS_GROUP_NAME:
+        return None
+    return GroupProfile.objects.filter(slug=groups_settings.REGISTERED_MEMBERS_GROUP_NAME).first()
+
+
+def add_users_to_registered_members(user_ids, groupprofile=None):
+    """Bulk equivalent of ``geonode.people.signals._add_user_to_registered_members``.
+
+    Creates the missing GroupMember rows and ``user.groups`` links of
+    ``user_ids`` with two inserts; existing memberships keep their role.
+    Returns the number of new memberships.
+    """
+    from geonode.groups.models import GroupMember
+    from guardian.utils import get_anonymous_user
+
+    groupprofile = groupprofile or registered_members_group()
+    user_ids = set(user_ids) - {get_anonymous_user().pk}
+    if groupprofile is None or not user_ids:
+        return 0
+
+    members = set(GroupMember.objects.filter(
+        group=groupprofile, user_id__in=user_ids).values_list('user_id', flat=True))
+    GroupMember.objects.bulk_create(
+        [GroupMember(group=groupprofile, user_id=_pk, role=GroupMember.MEMBER) for _pk in user_ids - members],
+        ignore_conflicts=True)
+
+    groups = get_user_model().groups
+    through = groups.through
+    user_field = f'{groups.field.m2m_field_name()}_id'
+    group_field = f'{groups.field.m2m_reverse_field_name()}_id'
+    through.objects.bulk_create(
+        [through(**{user_field: _pk, group_field: groupprofile.group_id}) for _pk in user_ids],
+        ignore_conflicts=True)
+    return len(user_ids - members)
+
+
+def activate_users(user_ids, chunk_size=1000, progress=None):
+    """Activate ``user_ids`` and add them to the registered members, ``chunk_size`` users at a time.
+
+    :param progress: optional ``progress(done, total)`` called after each chunk
+    """
+    user_ids = sorted(set(user_ids))
+    groupprofile = registered_members_group()
+    activated = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        activated += get_user_model().objects.filter(pk__in=chunk).update(is_active=True)
+        if groupprofile is not None:
+            add_users_to_registered_members(chunk, groupprofile)
+        if progress:
+            progress(start + len(chunk), len(user_ids))
+    return activated
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""MapFish print helpers for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import json
+import logging
+import re
+from json import JSONDecodeError
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+print_re = re.compile(r'/pdf/create.json', re.I)
+
+# Never written to the broker; the print task authenticates as the job owner instead
+CREDENTIAL_HEADERS = ('authorization', 'cookie', 'proxy-authorization', 'x-csrftoken')
+
+
+def is_print_request(url):
+    return bool(print_re.search(url))
+
+
+def print_job_headers(headers):
+    """The ``headers`` of a print request which may be queued with its job."""
+    return {_k: _v for _k, _v in headers.items() if _k.lower() not in CREDENTIAL_HEADERS}
+
+
+def inject_mapbox_token(spec, access_token):
+    """Add ``access_token`` to the customParams of every Mapbox layer in ``spec``.
+
+    Returns True when at least one layer was changed.
+    """
+    changed = False
+    for layer in spec.get('layers', []):
+        if 'mapbox' not in layer.get('baseURL', ""):
+            continue
+        # Geonode may set WMTS customParams with a trailing space
+        if 'customParams ' in layer:
+            layer['customParams ']['access_token'] = access_token
+        layer.setdefault('customParams', {})['access_token'] = access_token
+        if layer.get("type", "") == "xyz":
+            # remove mapbox token
+            layer["path_format"] = layer.get("path_format", "").split("?")[0]
+        changed = True
+    return changed
+
+
+def rewrite_print_spec(data, method):
+    """Parse a MapFish print spec once and inject the Mapbox token into it.
+
+    The spec is only re-serialized when a layer was changed; invalid JSON is
+    logged and returned untouched.
+    """
+    if not data:
+        return data
+    try:
+        spec = json.loads(data)
+    except JSONDecodeError as exc:
+        logger.exception(exc)
+        return data
+    if not isinstance(spec, dict):
+        return data
+
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Print spec: %d bytes, %d layers", len(data), len(spec.get('layers', [])))
+    if method == "POST" and inject_mapbox_token(spec, settings.MAPBOX_ACCESS_TOKEN):
+        data = json.dumps(spec)
+        if debug:
+            logger.debug("Print spec rewritten with the Mapbox access token: %s", data)
+    return data
@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""Helpers for the UNDP PNG proxy view.
+
+@Date : 2026-10-18
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from distutils.version import StrictVersion
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseForbidden
+from django.http.request import validate_host
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from geonode import geoserver  # noqa
+from geonode.proxy.views import ows_regexp
+from geonode.utils import check_ogc_backend
+
+from .cache import get_or_compute
+
+logger = logging.getLogger(__name__)
+
+PROXY_CACHE_ALIAS = 'proxy'
+PROXY_ALLOWED_HOSTS_KEY = 'undp_png:proxy:allowed_hosts'
+PROXY_STREAM_CHUNK_SIZE = getattr(settings, 'PROXY_STREAM_CHUNK_SIZE', 64 * 1024)
+PROXY_POOL_MAXSIZE = getattr(settings, 'PROXY_POOL_MAXSIZE', 10)
+PROXY_POOL_BLOCK = getattr(settings, 'PROXY_POOL_BLOCK', False)
+PROXY_MAX_RETRIES = getattr(settings, 'PROXY_MAX_RETRIES', 3)
+PROXY_BACKOFF_FACTOR = getattr(settings, 'PROXY_BACKOFF_FACTOR', 0.3)
+PROXY_RETRY_STATUSES = getattr(settings, 'PROXY_RETRY_STATUSES', (502, 503, 504))
+PROXY_VERIFY_SSL = getattr(settings, 'PROXY_VERIFY_SSL', False)
+
+PROXY_RESPONSE_CACHE_ENABLED = getattr(settings, 'PROXY_RESPONSE_CACHE_ENABLED', False)
+PROXY_RESPONSE_CACHE_MAX_BYTES = getattr(settings, 'PROXY_RESPONSE_CACHE_MAX_BYTES', 4 * 1024 * 1024)
+PROXY_RESPONSE_CACHE_TTL = getattr(settings, 'PROXY_RESPONSE_CACHE_TTL', 300)
+PROXY_CACHEABLE_OWS_REQUESTS = ('getcapabilities', 'describefeaturetype', 'getlegendgraphic')
+PROXY_CACHE_VARY_HEADERS = ('Accept', 'Accept-Language', 'Accept-Encoding')
+PROXY_CACHED_RESPONSE_HEADERS = ('Content-Disposition', 'ETag', 'Last-Modified')
+
+_max_age_re = re.compile(r'(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*"?(\d+)', re.I)
+
+# Upstream sessions of this worker, keyed by (scheme, netloc)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _build_proxy_allowed_hosts():
+    """Collect the configured, local and remote service hosts the proxy may reach.
+
+    Returns a tuple ``(hosts, patterns)`` where ``hosts`` is a frozenset of exact
+    hostnames and ``patterns`` holds the wildcard entries ('*', '.example.com')
+    which still need ``validate_host``.
+    """
+    entries = set(getattr(settings, 'PROXY_ALLOWED_HOSTS', ()))
+
+    # Attach current SITEURL
+    entries.add(urlsplit(settings.SITEURL).hostname)
+
+    # Attach current geoserver hostname
+    if check_ogc_backend(geoserver.BACKEND_PACKAGE):
+        from geonode.geoserver.helpers import ogc_server_settings
+        if ogc_server_settings:
+            entries.add(ogc_server_settings.hostname)
+
+    # Attach Remote Services base_urls
+    from geonode.services.models import Service
+    for base_url in Service.objects.values_list('base_url', flat=True).iterator():
+        entries.add(urlsplit(base_url).hostname)
+
+    entries = {_e.lower() for _e in entries if _e}
+    patterns = tuple(_e for _e in entries if _e == '*' or _e.startswith('.'))
+    hosts = frozenset(entries.difference(patterns))
+    return hosts, patterns
+
+
+def get_proxy_allowed_hosts():
+    """Return the cached proxy allowlist, building it on a cache miss."""
+    return get_or_compute(PROXY_ALLOWED_HOSTS_KEY, _build_proxy_allowed_hosts, alias=PROXY_CACHE_ALIAS)
+
+
+def invalidate_proxy_allowed_hosts(*args, **kwargs):
+    """Drop the cached proxy allowlist; used as a ``Service`` signal receiver."""
+    caches[PROXY_CACHE_ALIAS].delete(PROXY_ALLOWED_HOSTS_KEY)
+
+
+def is_proxy_host_allowed(hostname):
+    """Check ``hostname`` against the cached allowlist without hitting the DB."""
+    if not hostname:
+        return False
+    hosts, patterns = get_proxy_allowed_hosts()
+    hostname = hostname.lower()
+    return hostname in hosts or (bool(patterns) and validate_host(hostname, patterns))
+
+
+def is_ows_capabilities_request(query):
+    """Check whether ``query`` asks an OWS service of any host for its capabilities."""
+    match = ows_regexp.match(query) if query else None
+    if not match:
+        return False
+    ows_tokens = match.groups()
+    return (len(ows_tokens) == 4 and 'version' == ows_tokens[0]
+            and StrictVersion("1.0.0") <= StrictVersion(ows_tokens[1]) <= StrictVersion("3.0.0")
+            and ows_tokens[2].lower() in ('getcapabilities')
+            and ows_tokens[3].upper() in ('OWS', 'WCS', 'WFS', 'WMS', 'WPS', 'CSW'))
+
+
+def forbidden_proxy_url(url, allow_ows_capabilities=True):
+    """A 403 response when DEBUG is off and the split ``url`` may not be reached, else None.
+
+    Its host must be allowed, see ``is_proxy_host_allowed``, unless
+    ``allow_ows_capabilities`` is set and it is an OWS GetCapabilities request.
+    """
+    if settings.DEBUG or is_proxy_host_allowed(url.hostname):
+        return None
+    if allow_ows_capabilities and is_ows_capabilities_request(url.query):
+        return None
+    return HttpResponseForbidden(
+        "DEBUG is set to False but the host of the path provided to the proxy service"
+        " is not in the PROXY_ALLOWED_HOSTS setting.",
+        content_type="text/plain")
+
+
+def to_local_geoserver(*texts):
+    """Point the SITEURL geoserver urls of ``texts`` at the local geoserver.
+
+    Avoids translating local geoserver calls into external ones.
+    """
+    if not check_ogc_backend(geoserver.BACKEND_PACKAGE):
+        return texts
+    from geonode.geoserver.helpers import ogc_server_settings
+    public, local = f'{settings.SITEURL}geoserver', ogc_server_settings.LOCATION.rstrip('/')
+    return tuple(_text.replace(public, local) for _text in texts)
+
+
+def to_public_geoserver(text):
+    """Point the local geoserver urls of ``text`` back at SITEURL."""
+    if not check_ogc_backend(geoserver.BACKEND_PACKAGE):
+        return text
+    from geonode.geoserver.helpers import ogc_server_settings
+    return text.replace(ogc_server_settings.LOCATION.rstrip('/'), f'{settings.SITEURL}geoserver')
+
+
+def iter_upstream_content(response, chunk_size=PROXY_STREAM_CHUNK_SIZE):
+    """Yield the upstream body in chunks, releasing the connection when done."""
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                yield chunk
+    finally:
+        response.close()
+
+
+def _reset_upstream_sessions():
+    """Forget the parent's sessions so forked workers never share sockets."""
+    _sessions.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_upstream_sessions)
+
+
+def get_upstream_session(url):
+    """Return the keep-alive session of this worker for the host of ``url``."""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                # never persist upstream cookies across users
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                session.verify = PROXY_VERIFY_SSL
+                retry = Retry(
+                    total=PROXY_MAX_RETRIES,
+                    backoff_factor=PROXY_BACKOFF_FACTOR,
+                    status_forcelist=PROXY_RETRY_STATUSES,
+                    raise_on_status=False)
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=PROXY_POOL_MAXSIZE,
+                    pool_block=PROXY_POOL_BLOCK,
+                    max_retries=retry)
+                session.mount(f"{parts.scheme}://", adapter)
+                _sessions[key] = session
+    return session
+
+
+def _add_geoserver_token(url, headers, user):
+    """Authenticate calls to the local geoserver as ``user``, as http_client does."""
+    if 'Authorization' in headers or not user or not user.is_authenticated:
+        return
+    if not check_ogc_backend(geoserver.BACKEND_PACKAGE):
+        return
+    from geonode.geoserver.helpers import ogc_server_settings
+    if urlsplit(url).netloc != urlsplit(ogc_server_settings.LOCATION).netloc:
+        return
+    try:
+        from geonode.base.auth import get_or_create_token
+        access_token = get_or_create_token(user)
+        if access_token and not access_token.is_expired():
+            headers['Authorization'] = f'Bearer {access_token.token}'
+    except Exception as e:
+        logger.debug(e)
+
+
+def proxy_request(url, method='GET', data=None, headers=None, stream=False, timeout=None, user=None):
+    """Drop-in for ``http_client.request`` reusing pooled upstream connections.
+
+    Returns ``(response, content)``; ``response`` is None and ``content`` the
+    error message when the upstream call fails.
+    """
+    headers = dict(headers or {})
+    _add_geoserver_token(url, headers, user)
+    session = get_upstream_session(url)
+    try:
+        response = session.request(
+            method.upper(),
+            url,
+            data=data,
+            headers=headers,
+            stream=stream,
+            timeout=timeout)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.exception(Exception(f"Request exception [{e}] - TOUT [{timeout}] to URL: {url}"))
+        return None, str(e)
+    return response, (response.raw if stream else response.content)
+
+
+class CachedProxyResponse:
+    """An upstream OGC response kept by :class:`ProxyResponseCache`."""
+
+    __slots__ = ('content', 'status', 'content_type', 'headers', 'expires')
+
+    def __init__(self, content, status, content_type, headers, ttl):
+        self.content = content
+        self.status = status
+        self.content_type = content_type
+        self.headers = headers
+        self.expires = time.monotonic() + ttl
+
+    @property
+    def size(self):
+        return len(self.content)
+
+    def is_fresh(self):
+        return time.monotonic() < self.expires
+
+    def validators(self):
+        """Conditional request headers to revalidate a stale entry upstream."""
+        _validators = {}
+        if 'ETag' in self.headers:
+            _validators['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            _validators['If-Modified-Since'] = self.headers['Last-Modified']
+        return _validators
+
+    def to_response(self):
+        return HttpResponse(
+            content=self.content,
+            status=self.status,
+            content_type=self.content_type)
+
+
+def cache_ttl(response_headers):
+    """Seconds an upstream response may be reused for, None if it must not be stored."""
+    cache_control = response_headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    max_age = _max_age_re.search(cache_control)
+    if max_age:
+        return min(int(max_age.group(1)), PROXY_RESPONSE_CACHE_TTL)
+    return PROXY_RESPONSE_CACHE_TTL
+
+
+class ProxyResponseCache:
+    """Per-worker LRU of upstream responses bounded by TTL and a memory budget.
+
+    Every uwsgi process holds its own, see PROXY_RESPONSE_CACHE_MAX_BYTES.
+    """
+
+    def __init__(self, max_bytes=PROXY_RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry for ``key`` (possibly stale) and mark it recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, response):
+        """Store a buffered upstream ``response`` honouring its Cache-Control."""
+        ttl = cache_ttl(response.headers)
+        content = response.content
+        if ttl is None or not content or len(content) > self.max_bytes:
+            return None
+        headers = {_h: response.headers[_h] for _h in PROXY_CACHED_RESPONSE_HEADERS if _h in response.headers}
+        if not ttl and not headers.keys() & {'ETag', 'Last-Modified'}:
+            # nothing to revalidate against
+            return None
+        entry = CachedProxyResponse(
+            content, response.status_code, response.headers.get('Content-Type'), headers, ttl)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+        return entry
+
+    def revalidate(self, key, entry, response_headers):
+        """Extend ``entry`` after the upstream answered 304 Not Modified."""
+        ttl = cache_ttl(response_headers)
+        if ttl is None:
+            self.delete(key)
+        else:
+            entry.expires = time.monotonic() + ttl
+        return entry
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+
+proxy_response_cache = ProxyResponseCache()
+
+
+def response_cache_key(method, url, headers, user):
+    """Key a cacheable OGC request, None if the request must not be cached.
+
+    Only GetCapabilities, DescribeFeatureType and GetLegendGraphic GETs are
+    cached; the key covers the normalized url, the requesting user and the
+    headers the upstream may vary on.
+    """
+    if not PROXY_RESPONSE_CACHE_ENABLED or method != 'GET':
+        return None
+    query = dict((_k.lower(), _v) for _k, _v in parse_qsl(urlsplit(url).query))
+    if query.get('request', '').lower() not in PROXY_CACHEABLE_OWS_REQUESTS:
+        return None
+    if user and user.is_authenticated:
+        _context = f'user:{user.pk}'
+    else:
+        _context = 'anonymous'
+    _vary = '|'.join(f'{_h}={headers.get(_h, "")}' for _h in PROXY_CACHE_VARY_HEADERS)
+    return hashlib.sha1(f'{url}|{_context}|{_vary}'.encode('utf-8')).hexdigest()
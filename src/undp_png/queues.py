@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Celery queues of the celery-cmd worker profiles for UNDP PNG.
+
+Each profile consumes the queues UNDP_PNG_WORKER_PROFILES assigns it, the
+"default" profile every other declared queue, so that none is left unconsumed.
+
+@Date : 2026-10-18
+"""
+import logging
+from importlib import import_module
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = 'default'
+
+
+def declared_queues():
+    """The names of the CELERY_TASK_QUEUES, task_default_queue first."""
+    names = [getattr(_queue, 'name', _queue) for _queue in settings.CELERY_TASK_QUEUES]
+    default = getattr(settings, 'CELERY_TASK_DEFAULT_QUEUE', 'celery')
+    if default not in names:
+        names.insert(0, default)
+    return names
+
+
+def profile_queues(profile):
+    """The declared queues consumed by the ``profile`` worker."""
+    profiles = settings.UNDP_PNG_WORKER_PROFILES
+    queues = declared_queues()
+    if profile == DEFAULT_PROFILE:
+        assigned = {_queue for _queues in profiles.values() for _queue in _queues}
+        return [_queue for _queue in queues if _queue not in assigned]
+    if profile not in profiles:
+        raise KeyError(profile)
+    return [_queue for _queue in profiles[profile] if _queue in queues]
+
+
+def override_task_queues(*apps):
+    """Move the GeoNode tasks of UNDP_PNG_TASK_QUEUE_OVERRIDES to their queue in ``apps``.
+
+    The queue a task is declared with wins over CELERY_TASK_ROUTES, so the
+    attribute of the registered task itself is replaced.
+    """
+    for name, queue in settings.UNDP_PNG_TASK_QUEUE_OVERRIDES.items():
+        try:
+            import_module(name.rsplit('.', 1)[0])
+        except ImportError as e:
+            logger.debug(f"Not moving {name} to the {queue} queue: {e}")
+            continue
+        for app in apps:
+            task = app.tasks.get(name)
+            if task is None:
+                logger.debug(f"Not moving {name} to the {queue} queue: not registered in {app.main}")
+                continue
+            task.queue = queue
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Leader elected Celery beat scheduler for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import logging
+
+from django.conf import settings
+from django.db import connections
+from django_celery_beat.schedulers import DatabaseScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def beat_lock_id():
+    """Key of the Postgres advisory lock the beat leader holds."""
+    return getattr(settings, 'BEAT_LEADER_LOCK_ID', 471100)
+
+
+class LeaderDatabaseScheduler(DatabaseScheduler):
+    """DatabaseScheduler sending periodic tasks only while it holds a Postgres advisory lock.
+
+    Any number of beat processes may run; the one holding the lock is the
+    leader and the others poll it every BEAT_LEADER_RETRY seconds.
+    The lock lives on a connection of its own, so closing Django's
+    connections never releases it; losing that connection does, and the
+    next tick competes for the lock again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock_connection = None
+        self._is_leader = False
+        super().__init__(*args, **kwargs)
+
+    def _lock_cursor(self):
+        if self._lock_connection is None or self._lock_connection.closed:
+            wrapper = connections['default']
+            params = wrapper.get_connection_params()
+            # bypass a transaction pooling PgBouncer, which would drop the session lock
+            if getattr(settings, 'DB_POOLER_HOST', ''):
+                params.update(host=settings.BEAT_LEADER_DB_HOST, port=settings.BEAT_LEADER_DB_PORT)
+            self._lock_connection = wrapper.get_new_connection(params)
+            self._lock_connection.autocommit = True
+        return self._lock_connection.cursor()
+
+    def _release_lock_connection(self):
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.close()
+            except Exception as e:
+                logger.debug(e)
+        self._lock_connection = None
+        self._is_leader = False
+
+    def is_leader(self):
+        """Acquire the beat lock or check it is still held."""
+        try:
+            with self._lock_cursor() as cursor:
+                if self._is_leader:
+                    cursor.execute('SELECT 1')
+                else:
+                    cursor.execute('SELECT pg_try_advisory_lock(%s)', [beat_lock_id()])
+                    self._is_leader = cursor.fetchone()[0]
+                    if self._is_leader:
+                        logger.info("Acquired the beat lock, sending periodic tasks.")
+        except Exception as e:
+            if self._is_leader:
+                logger.warning(f"Lost the beat lock: {e}")
+            else:
+                logger.exception(e)
+            self._release_lock_connection()
+        return self._is_leader
+
+    def tick(self, *args, **kwargs):
+        if not self.is_leader():
+            return getattr(settings, 'BEAT_LEADER_RETRY', 10)
+        return super().tick(*args, **kwargs)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release_lock_connection()
@@ -50,6 +50,32 @@ SITENAME = os.getenv("SITENAME", 'undp_png')
 PROXY_HOST = os.getenv("HTTPS_HOST", 'png-geoportal.org')
 PROXY_ALLOWED_HOSTS = [PROXY_HOST, f'www.{PROXY_HOST}', 'geoserver']
 
+# Stream successful upstream responses through the proxy instead of buffering them
+PROXY_STREAMING_ENABLED = ast.literal_eval(os.getenv('PROXY_STREAMING_ENABLED', 'True'))
+PROXY_STREAM_CHUNK_SIZE = int(os.getenv('PROXY_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Keep-alive connection pools of the proxy, one per upstream host and worker
+PROXY_POOL_MAXSIZE = int(os.getenv('PROXY_POOL_MAXSIZE', 10))
+PROXY_POOL_BLOCK = ast.literal_eval(os.getenv('PROXY_POOL_BLOCK', 'False'))
+PROXY_MAX_RETRIES = int(os.getenv('PROXY_MAX_RETRIES', 3))
+PROXY_BACKOFF_FACTOR = float(os.getenv('PROXY_BACKOFF_FACTOR', 0.3))
+
+# Per-worker cache of GetCapabilities, DescribeFeatureType and GetLegendGraphic responses
+PROXY_RESPONSE_CACHE_ENABLED = ast.literal_eval(os.getenv('PROXY_RESPONSE_CACHE_ENABLED', 'False'))
+# Budget of each uwsgi process, so up to `processes` times this much in total; keep it
+# well under reload-on-rss
+PROXY_RESPONSE_CACHE_MAX_BYTES = int(os.getenv('PROXY_RESPONSE_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+PROXY_RESPONSE_CACHE_TTL = int(os.getenv('PROXY_RESPONSE_CACHE_TTL', 300))
+
+# Profile admin activations above this many users run in a Celery task
+USER_ACTIVATION_ASYNC_THRESHOLD = int(os.getenv('USER_ACTIVATION_ASYNC_THRESHOLD', 500))
+
+# Invitations sent per Celery task, over a single SMTP connection
+INVITATION_BATCH_SIZE = int(os.getenv('INVITATION_BATCH_SIZE', 50))
+
+# Seconds a Celery worker waits for MapFish to render an asynchronous print job
+PRINT_JOB_TIMEOUT = int(os.getenv('PRINT_JOB_TIMEOUT', 600))
+
 # Defines the directory that contains the settings file as the LOCAL_ROOT
 # It is used for relative settings elsewhere.
 LOCAL_ROOT = os.path.abspath(os.path.dirname(__file__))
@@ -141,6 +167,55 @@ if CENTRALIZED_DASHBOARD_ENABLED and USER_ANALYTICS_ENABLED and 'geonode_logstas
         'schedule': 3600.0,
     }
 
+# Dedicated Celery queues, consumed by the worker profiles of celery-cmd (CELERY__MODE=profiles):
+# interactive for user facing tasks, bulk for batch jobs, geoserver for GeoServer syncs and
+# thumbnails and maintenance for housekeeping, so that fast tasks never wait behind long ones
+from kombu import Exchange, Queue  # noqa
+
+UNDP_PNG_TASK_QUEUE_MAX_PRIORITY = int(os.getenv('UNDP_PNG_TASK_QUEUE_MAX_PRIORITY', 10))
+CELERY_TASK_DEFAULT_PRIORITY = int(os.getenv('CELERY_TASK_DEFAULT_PRIORITY', 5))
+# Reserve one task per process at a time; long jobs would otherwise hold back prefetched ones
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', 1))
+UNDP_PNG_TASK_QUEUES = ('interactive', 'bulk', 'geoserver', 'maintenance')
+CELERY_TASK_QUEUES = tuple(CELERY_TASK_QUEUES) + tuple(
+    Queue(_queue, Exchange('default', type='topic', durable=True), routing_key=_queue,
+          queue_arguments={'x-max-priority': UNDP_PNG_TASK_QUEUE_MAX_PRIORITY})
+    for _queue in UNDP_PNG_TASK_QUEUES
+)
+# The queues each worker profile consumes, see "manage.py celery_queues <profile>":
+#   geoserver    GeoNode's geoserver.catalog, geoserver.data, geoserver.events and all.geoserver
+#   maintenance  GeoNode's cleanup and management_commands_http
+#   default      every other declared queue: GeoNode's default, geonode, update, email, security,
+#                broadcast, email.events, notifications.events and geonode.layer.viewer among them
+UNDP_PNG_WORKER_PROFILES = {
+    'interactive': ('interactive',),
+    'bulk': ('bulk',),
+    'geoserver': ('geoserver', 'geoserver.catalog', 'geoserver.data', 'geoserver.events', 'all.geoserver'),
+    'maintenance': ('maintenance', 'cleanup', 'management_commands_http'),
+}
+# GeoNode tasks moved off the queue they are declared with, by task name
+UNDP_PNG_TASK_QUEUE_OVERRIDES = {
+    'geonode.geoserver.tasks.geoserver_create_thumbnail': 'geoserver',
+    'geonode.geoserver.tasks.geoserver_post_save_layers': 'geoserver',
+    'geonode.geoserver.tasks.geoserver_update_layers': 'geoserver',
+    'geonode.documents.tasks.create_document_thumbnail': 'geoserver',
+    'geonode.geoserver.tasks.geoserver_cascading_delete': 'maintenance',
+    'geonode.layers.tasks.delete_layer': 'maintenance',
+    'geonode.security.tasks.synch_guardian': 'maintenance',
+}
+
+# Record queue wait, run time, RSS delta and result size histograms of every Celery task,
+# exposed at /metrics/tasks/ for superusers or a "Bearer TASK_METRICS_TOKEN" authorization
+TASK_METRICS_ENABLED = ast.literal_eval(os.getenv('TASK_METRICS_ENABLED', 'True'))
+# Seconds each worker process sums its observations before writing them to the TaskMetric rows
+TASK_METRICS_FLUSH_INTERVAL = int(os.getenv('TASK_METRICS_FLUSH_INTERVAL', 60))
+TASK_METRICS_TOKEN = os.getenv('TASK_METRICS_TOKEN', '')
+
+# Beat processes started with undp_png.scheduler:LeaderDatabaseScheduler elect a leader through
+# this Postgres advisory lock; the others retry every BEAT_LEADER_RETRY seconds
+BEAT_LEADER_LOCK_ID = int(os.getenv('BEAT_LEADER_LOCK_ID', 471100))
+BEAT_LEADER_RETRY = int(os.getenv('BEAT_LEADER_RETRY', 10))
+
 LDAP_ENABLED = ast.literal_eval(os.getenv('LDAP_ENABLED', 'False'))
 if LDAP_ENABLED and 'geonode_ldap' not in INSTALLED_APPS:
     INSTALLED_APPS += ('geonode_ldap',)
@@ -199,6 +274,102 @@ THUMBNAIL_GENERATOR_DEFAULT_SIZE = {"width": 420, "height": 350}
 THUMBNAIL_GENERATOR_DEFAULT_SIZE_WIDTH = 420
 THUMBNAIL_GENERATOR_DEFAULT_SIZE_HEIGHT = 350
 
+# Widths of the responsive variants derived from curated thumbnails, e.g. "210,420,840"
+CURATED_THUMBNAIL_SRCSET_WIDTHS = [int(_w) for _w in os.getenv('CURATED_THUMBNAIL_SRCSET_WIDTHS', '').split(',') if _w]
+# Any format supported by the installed Pillow, e.g. WEBP or AVIF
+CURATED_THUMBNAIL_SRCSET_FORMAT = os.getenv('CURATED_THUMBNAIL_SRCSET_FORMAT', 'WEBP')
+
+# Caches
+# Every alias below is backed by CACHE_BACKEND unless <ALIAS>_CACHE_BACKEND overrides it:
+#   locmem     per process, lost on each uwsgi or celery recycle
+#   memcached  MEMCACHED_LOCATION, shared by every process and container
+#   redis      REDIS_CACHE_LOCATION, any Redis compatible server (needs django-redis)
+#   dummy      no caching
+# api-listings, proxy and mapstore are invalidated from signals, which with locmem only
+# reach the process that saved the change: the others serve stale values until they expire.
+# Hence CACHE_BACKEND defaults to memcached as soon as MEMCACHED_LOCATION is set.
+MEMCACHED_ENABLED = ast.literal_eval(os.getenv('MEMCACHED_ENABLED', 'False'))
+MEMCACHED_BACKEND = os.getenv('MEMCACHED_BACKEND', 'django.core.cache.backends.memcached.MemcachedCache')
+MEMCACHED_LOCATION = os.getenv('MEMCACHED_LOCATION', '127.0.0.1:11211')
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'memcached': MEMCACHED_BACKEND,
+    'redis': 'django_redis.cache.RedisCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND', 'memcached' if MEMCACHED_ENABLED or 'MEMCACHED_LOCATION' in os.environ else 'locmem')
+REDIS_CACHE_LOCATION = os.getenv('REDIS_CACHE_LOCATION', 'redis://127.0.0.1:6379/1')
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', PROJECT_NAME)
+# Bump to orphan every cached value at once, e.g. when a deploy changes what they hold
+CACHE_VERSION = int(os.getenv('CACHE_VERSION', 1))
+
+
+def cache_settings(alias, timeout, max_entries=1000, backend=None):
+    """The CACHES entry of ``alias``, see CACHE_BACKENDS."""
+    backend = os.getenv(f"{alias.upper().replace('-', '_')}_CACHE_BACKEND", backend or CACHE_BACKEND)
+    config = {
+        'BACKEND': CACHE_BACKENDS[backend],
+        'TIMEOUT': timeout,
+        'KEY_PREFIX': f'{CACHE_KEY_PREFIX}:{alias}',
+        'VERSION': CACHE_VERSION,
+    }
+    if backend == 'locmem':
+        config['LOCATION'] = alias
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries}
+    elif backend == 'memcached':
+        config['LOCATION'] = MEMCACHED_LOCATION
+    elif backend == 'redis':
+        config['LOCATION'] = REDIS_CACHE_LOCATION
+    return config
+
+
+# default keeps the GeoNode behaviour (no caching unless MEMCACHED_ENABLED) unless DEFAULT_CACHE_BACKEND is set
+CACHES['default'] = cache_settings(
+    'default', int(os.getenv('DEFAULT_CACHE_TIMEOUT', 300)),
+    backend='memcached' if MEMCACHED_ENABLED else 'dummy')
+# Only used when SESSION_ENGINE is a cache or cached_db engine
+CACHES['sessions'] = cache_settings('sessions', int(os.getenv('SESSIONS_CACHE_TIMEOUT', 1209600)), 10000)
+SESSION_CACHE_ALIAS = 'sessions'
+# Home page category counts per permission class, invalidated on resource and permission changes
+CACHES['api-listings'] = cache_settings('api-listings', int(os.getenv('CATEGORY_COUNTS_CACHE_TIMEOUT', 300)), 5000)
+# Seconds the CategoryResourceCount refresh task waits, so that a burst of saves is counted once
+CATEGORY_COUNTS_REFRESH_DELAY = int(os.getenv('CATEGORY_COUNTS_REFRESH_DELAY', 5))
+# Proxy allowed hosts, invalidated on Service changes
+CACHES['proxy'] = cache_settings('proxy', int(os.getenv('PROXY_CACHE_TIMEOUT', 300)))
+# Thumbnail derivation locks
+CACHES['thumbnails'] = cache_settings('thumbnails', 600)
+# Converted MapStore2 viewer configs, invalidated on Map, MapLayer and MapStoreResource changes
+CACHES['mapstore'] = cache_settings('mapstore', int(os.getenv('MAPSTORE_CONFIG_CACHE_TIMEOUT', 600)), 2000)
+
+# Database connections
+# CONN_MAX_AGE per alias: seconds a connection is reused across requests and tasks,
+# 0 closes it after each of them and None never does; mind POSTGRESQL_MAX_CONNECTIONS
+# against uwsgi processes + celery concurrency when raising them
+DB_CONN_MAX_AGE = int(os.getenv('GEONODE_DB_CONN_MAX_AGE', 0))
+# Check persistent connections with a cheap query before a request or task uses them
+DB_CONN_HEALTH_CHECKS = ast.literal_eval(os.getenv('DB_CONN_HEALTH_CHECKS', 'True'))
+# Optional PgBouncer (transaction pooling) in front of both databases, e.g. DB_POOLER_HOST=pgbouncer
+DB_POOLER_HOST = os.getenv('DB_POOLER_HOST', '')
+DB_POOLER_PORT = os.getenv('DB_POOLER_PORT', '6432')
+# Session level advisory locks do not survive transaction pooling, so beat talks to PostgreSQL directly
+BEAT_LEADER_DB_HOST = DATABASES['default'].get('HOST', '')
+BEAT_LEADER_DB_PORT = DATABASES['default'].get('PORT', '')
+
+_db_aliases = ['default']
+if os.getenv('DEFAULT_BACKEND_DATASTORE') in DATABASES:
+    _db_aliases.append(os.getenv('DEFAULT_BACKEND_DATASTORE'))
+for _alias in _db_aliases:
+    _conn_max_age = os.getenv(f'{_alias.upper()}_DB_CONN_MAX_AGE', str(DB_CONN_MAX_AGE))
+    # the geodatabase gets its own dict, GeoNode may share OPTIONS between aliases
+    DATABASES[_alias] = dict(DATABASES[_alias], OPTIONS=dict(DATABASES[_alias].get('OPTIONS', {})))
+    DATABASES[_alias]['CONN_MAX_AGE'] = None if _conn_max_age == 'None' else int(_conn_max_age)
+    if DB_POOLER_HOST:
+        DATABASES[_alias]['HOST'] = DB_POOLER_HOST
+        DATABASES[_alias]['PORT'] = DB_POOLER_PORT
+        # server side cursors need the same backend connection for the whole transaction
+        DATABASES[_alias]['DISABLE_SERVER_SIDE_CURSORS'] = True
+
 DEFAULT_MAP_CENTER = (float(os.environ.get('DEFAULT_MAP_CENTER_X', 147.00)),
                       float(os.environ.get('DEFAULT_MAP_CENTER_Y', -9.5)))
 
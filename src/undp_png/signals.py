@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Signal receivers for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import logging
+
+from django.db.models import signals
+
+logger = logging.getLogger(__name__)
+
+
+def derive_curated_thumbnail(sender, instance, **kwargs):
+    """Queue the thumbnail derivation of a new or changed curated thumbnail."""
+    from .models import schedule_thumbnail_derivation
+    if instance.img and not instance.img_thumbnail_url:
+        schedule_thumbnail_derivation(instance.pk, force=True)
+
+
+def mirror_curated_thumbnail(sender, instance, **kwargs):
+    """Give a resource curated through GeoNode the CuratedThumbnailLarge listings read."""
+    from .models import mirror_curated_thumbnail as _mirror_curated_thumbnail
+    _mirror_curated_thumbnail(instance)
+
+
+def delete_derived_thumbnails(sender, instance, **kwargs):
+    """Delete the srcset variants of a deleted curated thumbnail once the deletion is committed."""
+    from django.db import transaction
+    from .models import delete_derived_thumbnails as _delete_derived_thumbnails
+    pk = instance.pk
+    transaction.on_commit(lambda: _delete_derived_thumbnails(pk))
+
+
+def invalidate_map_config(sender, instance, **kwargs):
+    """Drop the cached MapStore2 configs of the map a Map, MapLayer or MapStoreResource belongs to."""
+    from .mapstore import invalidate_map_config as _invalidate_map_config
+    map_id = getattr(instance, 'map_id', None) or instance.pk
+    if map_id:
+        _invalidate_map_config(map_id)
+
+
+def invalidate_object_map_config(sender, instance, **kwargs):
+    """Drop the cached MapStore2 configs of a resource whose permissions changed."""
+    from .mapstore import invalidate_map_config as _invalidate_map_config
+    _invalidate_map_config(instance.object_pk)
+
+
+def invalidate_category_counts(sender, instance, **kwargs):
+    """Drop the cached home page category counts when a resource is saved or deleted."""
+    from geonode.base.models import ResourceBase
+    if isinstance(instance, ResourceBase):
+        from .categories import invalidate_category_counts as _invalidate_category_counts
+        _invalidate_category_counts()
+
+
+def stash_resource_category(sender, instance, **kwargs):
+    """Remember the category a resource was loaded with, to refresh both on a change."""
+    # read from __dict__, a deferred category_id would cost a query per instance
+    instance._undp_png_old_category_id = instance.__dict__.get('category_id')
+
+
+def refresh_resource_category_counts(sender, instance, **kwargs):
+    """Refresh the CategoryResourceCount rows of a saved or deleted resource."""
+    from geonode.base.models import ResourceBase
+    if not isinstance(instance, ResourceBase):
+        return
+    old_category_id = getattr(instance, '_undp_png_old_category_id', None)
+    # saving a resource without changing its category leaves the counts alone
+    if kwargs.get('created') is False and instance.category_id == old_category_id:
+        return
+    from .categories import schedule_category_counts_refresh
+    schedule_category_counts_refresh(category_ids=(instance.category_id, old_category_id))
+    instance._undp_png_old_category_id = instance.category_id
+
+
+_view_permission = {}
+
+
+def view_resourcebase_permission_id():
+    """Id of the view_resourcebase permission, looked up once per process."""
+    if 'pk' not in _view_permission:
+        from django.contrib.auth.models import Permission
+        pk = Permission.objects.filter(
+            content_type__app_label='base', codename='view_resourcebase').values_list('pk', flat=True).first()
+        if pk is None:
+            # not migrated yet
+            return None
+        _view_permission['pk'] = pk
+    return _view_permission['pk']
+
+
+def refresh_object_category_counts(sender, instance, **kwargs):
+    """Refresh the CategoryResourceCount rows of a resource whose view permission changed."""
+    if instance.permission_id != view_resourcebase_permission_id():
+        return
+    from .categories import schedule_category_counts_refresh
+    schedule_category_counts_refresh(resource_ids=(instance.object_pk,))
+
+
+def ensure_usable_db_connections(**kwargs):
+    """Close the persistent connections the database dropped, so they are reopened on first use."""
+    from django.conf import settings
+    from django.db import connections
+    if not getattr(settings, 'DB_CONN_HEALTH_CHECKS', True):
+        return
+    for connection in connections.all():
+        if (connection.connection is not None and connection.settings_dict.get('CONN_MAX_AGE') != 0
+                and not connection.in_atomic_block and not connection.is_usable()):
+            connection.close()
+
+
+def connect_signals():
+    """Connect the undp_png receivers; called from ``AppConfig.ready``."""
+    from celery.signals import task_prerun
+    from django.core.signals import request_started
+    from geonode.base.models import CuratedThumbnail, ResourceBase
+    from geonode.documents.models import Document
+    from geonode.geoapps.models import GeoApp
+    from geonode.layers.models import Layer
+    from geonode.maps.models import Map, MapLayer
+    from geonode.services.models import Service
+    from guardian.models import GroupObjectPermission, UserObjectPermission
+    from mapstore2_adapter.api.models import MapStoreResource
+
+    from .categories import invalidate_category_counts as _invalidate_category_counts
+    from .models import CuratedThumbnailLarge
+    from .proxy_utils import invalidate_proxy_allowed_hosts
+
+    signals.post_save.connect(
+        invalidate_proxy_allowed_hosts, sender=Service, dispatch_uid='undp_png_proxy_hosts_save')
+    signals.post_delete.connect(
+        invalidate_proxy_allowed_hosts, sender=Service, dispatch_uid='undp_png_proxy_hosts_delete')
+
+    signals.post_save.connect(
+        derive_curated_thumbnail, sender=CuratedThumbnailLarge, dispatch_uid='undp_png_curated_thumbnail_save')
+    signals.post_save.connect(
+        mirror_curated_thumbnail, sender=CuratedThumbnail, dispatch_uid='undp_png_curated_thumbnail_mirror')
+    signals.post_delete.connect(
+        delete_derived_thumbnails, sender=CuratedThumbnailLarge, dispatch_uid='undp_png_curated_thumbnail_delete')
+
+    for _model in (Map, MapLayer, MapStoreResource):
+        signals.post_save.connect(
+            invalidate_map_config, sender=_model, dispatch_uid=f'undp_png_map_config_save_{_model.__name__}')
+        signals.post_delete.connect(
+            invalidate_map_config, sender=_model, dispatch_uid=f'undp_png_map_config_delete_{_model.__name__}')
+    for _model in (UserObjectPermission, GroupObjectPermission):
+        signals.post_save.connect(
+            invalidate_object_map_config, sender=_model,
+            dispatch_uid=f'undp_png_map_config_perms_save_{_model.__name__}')
+        signals.post_delete.connect(
+            invalidate_object_map_config, sender=_model,
+            dispatch_uid=f'undp_png_map_config_perms_delete_{_model.__name__}')
+
+    # Layer, Map, Document and GeoApp send their own sender, so listen to every model
+    signals.post_save.connect(invalidate_category_counts, dispatch_uid='undp_png_categories_save')
+    signals.post_delete.connect(invalidate_category_counts, dispatch_uid='undp_png_categories_delete')
+    for _model in (ResourceBase, Layer, Map, Document, GeoApp):
+        signals.post_init.connect(
+            stash_resource_category, sender=_model,
+            dispatch_uid=f'undp_png_category_counts_init_{_model.__name__}')
+    signals.post_save.connect(refresh_resource_category_counts, dispatch_uid='undp_png_category_counts_save')
+    signals.post_delete.connect(refresh_resource_category_counts, dispatch_uid='undp_png_category_counts_delete')
+    for _model in (UserObjectPermission, GroupObjectPermission):
+        signals.post_save.connect(
+            _invalidate_category_counts, sender=_model,
+            dispatch_uid=f'undp_png_categories_perms_save_{_model.__name__}')
+        signals.post_delete.connect(
+            _invalidate_category_counts, sender=_model,
+            dispatch_uid=f'undp_png_categories_perms_delete_{_model.__name__}')
+        signals.post_save.connect(
+            refresh_object_category_counts, sender=_model,
+            dispatch_uid=f'undp_png_category_counts_perms_save_{_model.__name__}')
+        signals.post_delete.connect(
+            refresh_object_category_counts, sender=_model,
+            dispatch_uid=f'undp_png_category_counts_perms_delete_{_model.__name__}')
+
+    # persistent connections, see DB_CONN_MAX_AGE
+    request_started.connect(ensure_usable_db_connections, dispatch_uid='undp_png_db_health_request')
+    task_prerun.connect(ensure_usable_db_connections, weak=False, dispatch_uid='undp_png_db_health_task')
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""Celery tasks for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from .celeryapp import app
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(
+    bind=True,
+    name='undp_png.tasks.submit_print_job',
+    queue='interactive',
+    priority=8,
+    acks_late=True,
+    ignore_result=True)
+def submit_print_job(self, job_id, url, data, headers, user_id=None):
+    """Send a rewritten print spec to MapFish and record the outcome on the PrintJob.
+
+    ``headers`` carry no credentials; calls to the local geoserver are
+    authenticated with a token of the user ``user_id``.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .models import PrintJob
+    from .proxy_utils import proxy_request
+
+    if not PrintJob.objects.filter(id=job_id).update(
+            status=PrintJob.STATUS_RUNNING, updated=timezone.now()):
+        logger.warning(f"Print job {job_id} does not exist anymore.")
+        return
+
+    response, content = proxy_request(
+        url,
+        method='POST',
+        data=data.encode('utf-8'),
+        headers=headers,
+        timeout=getattr(settings, 'PRINT_JOB_TIMEOUT', 600),
+        user=get_user_model().objects.filter(pk=user_id).first() if user_id else None)
+    if response is None:
+        status, result = PrintJob.STATUS_FAILURE, content
+    elif response.status_code >= 400:
+        status, result = PrintJob.STATUS_FAILURE, response.text or response.reason
+    else:
+        status, result = PrintJob.STATUS_SUCCESS, response.text
+    PrintJob.objects.filter(id=job_id).update(status=status, result=result, updated=timezone.now())
+
+
+@app.task(
+    bind=True,
+    name='undp_png.tasks.derive_curated_thumbnail',
+    queue='interactive',
+    priority=4,
+    max_retries=3,
+    ignore_result=True)
+def derive_curated_thumbnail(self, pk):
+    """Render the thumbnail and srcset variants of a CuratedThumbnailLarge off the request path."""
+    from .models import CuratedThumbnailLarge
+
+    curated = CuratedThumbnailLarge.objects.filter(pk=pk).first()
+    if curated is None:
+        return
+    if not curated.refresh_thumbnail_url():
+        raise self.retry(countdown=60)
+    try:
+        curated.derive_srcset()
+    except Exception as e:
+        logger.exception(e)
+    # a concurrent upload replaces the row, so only update this one
+    CuratedThumbnailLarge.objects.filter(pk=pk, img=curated.img.name).update(
+        img_thumbnail_url=curated.img_thumbnail_url,
+        img_srcset=curated.img_srcset,
+        img_thumbnail_generated=timezone.now())
+
+
+@app.task(
+    bind=True,
+    name='undp_png.tasks.activate_users',
+    queue='bulk',
+    acks_late=True)
+def activate_users(self, user_ids):
+    """Activate users selected in the Profile admin, reporting progress as a PROGRESS state."""
+    from .people import activate_users as _activate_users
+
+    def progress(done, total):
+        logger.info(f"Activated {done}/{total} users.")
+        self.update_state(state='PROGRESS', meta={'done': done, 'total': total})
+
+    return _activate_users(user_ids, progress=progress)
+
+
+@app.task(
+    bind=True,
+    name='undp_png.tasks.send_invitations',
+    queue='bulk',
+    acks_late=True,
+    max_retries=5,
+    ignore_result=True)
+def send_invitations(self, invitation_ids):
+    """Send a batch of invitations, retrying with a backoff on transient SMTP errors."""
+    from .invitations import is_transient_smtp_error, send_invitations as _send_invitations
+
+    try:
+        sent = _send_invitations(invitation_ids)
+    except Exception as e:
+        if is_transient_smtp_error(e):
+            raise self.retry(exc=e, countdown=60 * 2 ** self.request.retries)
+        raise
+    logger.info(f"Sent {sent}/{len(invitation_ids)} invitations.")
+
+
+@app.task(
+    bind=True,
+    name='undp_png.tasks.refresh_category_counts',
+    queue='maintenance',
+    priority=6,
+    ignore_result=True)
+def refresh_category_counts(self, category_ids, resource_ids=()):
+    """Recompute the CategoryResourceCount rows of the categories changed by recent saves."""
+    from .categories import refresh_queued_category_counts
+
+    refresh_queued_category_counts(category_ids, resource_ids)
@@ -4,29 +4,58 @@
 @Date : 2022-01-03
 @Author : CPoole
 """
+import functools
 import re
 
 from django import template
-from django.db.models import Count
-from geonode.base.models import ResourceBase
-from guardian.shortcuts import get_objects_for_user
+
+from undp_png.categories import category_counts
 
 register = template.Library()
 
 
+@functools.lru_cache(maxsize=128)
+def _compile(pattern):
+    return re.compile(pattern)
+
+
 @register.simple_tag
 def regex_replace(value, pattern, replace, *args, **kwargs):
-    return re.sub(pattern, replace, value)
+    return _compile(pattern).sub(replace, value)
+
+
+def _geoapp_view_url(url):
+    """Rewrite a GeoApp ``.../preview/<id>`` link to ``.../<id>/view#/``, as ``regex_replace`` would."""
+    start = url.find('preview/')
+    while start != -1:
+        head, tail = url[:start], url[start + len('preview/'):]
+        # str.isdecimal is the unicode class of \d
+        digits = 0
+        while digits < len(tail) and tail[digits].isdecimal():
+            digits += 1
+        if digits:
+            return f"{head}{tail[:digits]}/view#/{_geoapp_view_url(tail[digits:])}"
+        start = url.find('preview/', start + 1)
+    return url
+
+
+# Named rewrites of hot template urls, done with string operations
+URL_TRANSFORMS = {
+    'geoapp_view': _geoapp_view_url,
+}
+
+
+@register.filter
+def url_transform(value, name):
+    try:
+        transform = URL_TRANSFORMS[name]
+    except KeyError:
+        raise template.TemplateSyntaxError(f"Unknown url transform '{name}'")
+    return transform(value)
 
 
 @register.inclusion_tag(filename='base/iso_categories.html')
 def get_visible_resources_custom(user):
-    categories = get_objects_for_user(user, 'view_resourcebase', klass=ResourceBase, any_perm=False)\
-        .filter(category__isnull=False).values('category__gn_description',
-                                               'category__fa_class', 'category__description', 'category__identifier')\
-        .order_by('category__identifier')\
-        .annotate(count=Count('category'))
-
     return {
-        'iso_formats': categories
-    }
\ No newline at end of file
+        'iso_formats': category_counts(user)
+    }
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""Tests for UNDP PNG.
+
+@Date : 2026-10-18
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class FormatObjectsQueryCountTest(TestCase):
+    """The patched API listings run as many queries for one resource as for a full page."""
+
+    PAGE_SIZE = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        from geonode.base.populate_test_data import create_single_doc, create_single_layer, create_single_map
+        from geonode.geoapps.models import GeoApp
+        from geonode.maps.models import MapLayer
+
+        cls.owner, _created = get_user_model().objects.get_or_create(username='undp_png_owner')
+        layers = [create_single_layer(f'undp_png_layer_{_i}') for _i in range(cls.PAGE_SIZE)]
+        for _i, layer in enumerate(layers):
+            layer_map = create_single_map(f'undp_png_map_{_i}')
+            MapLayer.objects.create(
+                map=layer_map,
+                stack_order=0,
+                name=layer.alternate,
+                ows_url='',
+                layer_params='{}',
+                source_params='{}',
+                local=True)
+            create_single_doc(f'undp_png_doc_{_i}')
+            GeoApp.objects.create(title=f'undp_png_geoapp_{_i}', name=f'undp_png_geoapp_{_i}', owner=cls.owner)
+
+    def assertConstantQueries(self, resource, queryset):
+        """Format a page of 1 and of PAGE_SIZE resources of ``queryset`` with ``resource``."""
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:self.PAGE_SIZE])
+        self.assertEqual(len(ids), self.PAGE_SIZE)
+        with CaptureQueriesContext(connection) as single:
+            self.assertEqual(len(resource.format_objects(queryset.filter(pk__in=ids[:1]))), 1)
+        with self.assertNumQueries(len(single)):
+            self.assertEqual(len(resource.format_objects(queryset.filter(pk__in=ids))), self.PAGE_SIZE)
+
+    def test_layers(self):
+        from geonode.api.resourcebase_api import LayerResource
+        from geonode.layers.models import Layer
+        self.assertConstantQueries(LayerResource(), Layer.objects.filter(title__startswith='undp_png_layer_'))
+
+    def test_maps(self):
+        from geonode.api.resourcebase_api import MapResource
+        from geonode.maps.models import Map
+        self.assertConstantQueries(MapResource(), Map.objects.filter(title__startswith='undp_png_map_'))
+
+    def test_documents(self):
+        from geonode.api.resourcebase_api import DocumentResource
+        from geonode.documents.models import Document
+        self.assertConstantQueries(DocumentResource(), Document.objects.filter(title__startswith='undp_png_doc_'))
+
+    def test_geoapps(self):
+        from geonode.api.resourcebase_api import GeoAppResource
+        from geonode.geoapps.models import GeoApp
+        self.assertConstantQueries(GeoAppResource(), GeoApp.objects.filter(title__startswith='undp_png_geoapp_'))
+
+
+class UnsafeCharsEscaperTest(SimpleTestCase):
+    """The single pass escaper gives the output of the replaced per char loop."""
+
+    def test_many_overlay_config(self):
+        import json
+
+        from mapstore2_adapter.plugins.geonode import unsafe_chars
+
+        from .benchmarks import legacy_escape_unsafe_chars, sample_map_config
+        from .mapstore import unsafe_chars_escaper
+
+        json_str = json.dumps(sample_map_config(), sort_keys=True)
+        self.assertEqual(
+            unsafe_chars_escaper(unsafe_chars)(json_str), legacy_escape_unsafe_chars(json_str, unsafe_chars))
+
+    def test_multi_char_keys(self):
+        from .mapstore import unsafe_chars_escaper
+        unsafe_chars = {'<': '&lt;', '</': '&lt;/', '>': '&gt;'}
+        self.assertEqual(unsafe_chars_escaper(unsafe_chars)('<a></a>'), '&lt;a&gt;&lt;/a&gt;')
+
+
+@override_settings(MAPBOX_ACCESS_TOKEN='pk.test')
+class RewritePrintSpecTest(SimpleTestCase):
+    """The single pass print spec rewrite gives the spec of the replaced proxy code."""
+
+    def test_large_spec(self):
+        import contextlib
+        import io
+        import json
+
+        from .benchmarks import legacy_rewrite_print_spec, sample_print_spec
+        from .printing import rewrite_print_spec
+
+        data = json.dumps(sample_print_spec())
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = legacy_rewrite_print_spec(data, 'POST', 'pk.test')
+        self.assertEqual(json.loads(rewrite_print_spec(data, 'POST')), json.loads(expected))
+
+    def test_spec_without_mapbox_is_untouched(self):
+        import json
+
+        from .benchmarks import sample_print_spec
+        from .printing import rewrite_print_spec
+
+        spec = sample_print_spec(3)
+        del spec['layers'][0]
+        data = json.dumps(spec)
+        self.assertIs(rewrite_print_spec(data, 'POST'), data)
+
+
+@override_settings(MAPBOX_ACCESS_TOKEN='pk.test')
+class MapboxSourcesTest(SimpleTestCase):
+    """Splicing the pre-serialized Mapbox sources gives the config serialized with them inline."""
+
+    def setUp(self):
+        from .mapstore import mapbox_sources_json
+        mapbox_sources_json.cache_clear()
+        self.addCleanup(mapbox_sources_json.cache_clear)
+
+    def test_spliced_config(self):
+        from .benchmarks import legacy_serialize_map_config, sample_map_config, serialize_map_config
+        from .mapstore import mapbox_sources
+
+        data = sample_map_config()
+        self.assertEqual(
+            serialize_map_config(data), legacy_serialize_map_config(data, mapbox_sources('pk.test')))
+
+    def test_tile_matrices(self):
+        from .mapstore import google3857_tile_matrices
+
+        matrices = google3857_tile_matrices()
+        self.assertEqual(len(matrices), 24)
+        # the literals of the replaced sources
+        self.assertEqual(matrices[0]['ScaleDenominator'], '559082264.029')
+        self.assertEqual(matrices[0]['TopLeftCorner'], '-20037508.3428 20037508.3428')
+        self.assertEqual(matrices[10]['ScaleDenominator'], '545978.773466')
+        self.assertEqual(matrices[23]['MatrixWidth'], str(2 ** 23))
+
+
+class UrlTransformTest(SimpleTestCase):
+    """The geoapp_view url transform rewrites urls as the replaced regex_replace did."""
+
+    URLS = (
+        'http://localhost/apps/preview/42',
+        'http://localhost/apps/preview/42/',
+        'https://twitter.com/share?url=http://localhost/apps/preview/42',
+        'http://localhost/apps/preview/',
+        'http://localhost/apps/preview/abc',
+        'http://localhost/apps/42',
+        'preview/preview/3',
+        'preview/1preview/2',
+        'ppreview/9?next=preview/10',
+        'preview/\u0663',
+        '',
+    )
+
+    def test_urls(self):
+        import re
+
+        from .benchmarks import GEOAPP_VIEW_PATTERN, GEOAPP_VIEW_REPLACE
+        from .templatetags.undp_extras import url_transform
+
+        for url in self.URLS:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    url_transform(url, 'geoapp_view'), re.sub(GEOAPP_VIEW_PATTERN, GEOAPP_VIEW_REPLACE, url))
+
+    def test_social_links(self):
+        from django.template.loader import get_template
+
+        from .benchmarks import legacy_social_links_template, sample_social_links
+
+        context = {'resource': {'resource_type': 'geoapp'}, 'social_links': sample_social_links()}
+        self.assertEqual(get_template('social_links.html').render(context),
+                         legacy_social_links_template().render(context))
+
+
+class ResourceFormSpecTest(TestCase):
+    """ResourceFormSpec customizes the metadata forms as the replaced ``__init__`` did."""
+
+    def assertSameFields(self, form_class):
+        from .benchmarks import METADATA_FORM_PREFIX, legacy_metadata_form
+
+        expected = legacy_metadata_form(form_class).fields
+        fields = form_class(prefix=METADATA_FORM_PREFIX).fields
+        self.assertEqual(list(fields), list(expected))
+        for name, field in fields.items():
+            with self.subTest(form=form_class.__name__, field=name):
+                self.assertEqual(str(field.label), str(expected[name].label))
+                self.assertEqual(str(field.help_text), str(expected[name].help_text))
+                self.assertIs(type(field.widget), type(expected[name].widget))
+                self.assertEqual(getattr(field, 'hidden', False), getattr(expected[name], 'hidden', False))
+                self.assertEqual({_k: str(_v) for _k, _v in field.widget.attrs.items()},
+                                 {_k: str(_v) for _k, _v in expected[name].widget.attrs.items()})
+
+    def test_layer_form(self):
+        from geonode.layers.forms import LayerForm
+        self.assertSameFields(LayerForm)
+
+    def test_map_form(self):
+        from geonode.maps.forms import MapForm
+        self.assertSameFields(MapForm)
+
+    def test_document_form(self):
+        from geonode.documents.forms import DocumentForm
+        self.assertSameFields(DocumentForm)
+
+    def test_geoapp_form(self):
+        from geonode.geoapps.forms import GeoAppForm
+        self.assertSameFields(GeoAppForm)
+
+
+class WorkerProfilesTest(SimpleTestCase):
+    """The celery-cmd worker profiles consume every declared queue exactly once."""
+
+    def test_declared_queues(self):
+        from django.conf import settings
+
+        from .queues import DEFAULT_PROFILE, declared_queues, profile_queues
+
+        consumed = [
+            _queue
+            for _profile in (*settings.UNDP_PNG_WORKER_PROFILES, DEFAULT_PROFILE)
+            for _queue in profile_queues(_profile)
+        ]
+        self.assertEqual(sorted(consumed), sorted(declared_queues()))
+
+    def test_overrides_target_dedicated_queues(self):
+        from django.conf import settings
+        self.assertLessEqual(set(settings.UNDP_PNG_TASK_QUEUE_OVERRIDES.values()), set(settings.UNDP_PNG_TASK_QUEUES))
+
+
+class DeleteDerivedThumbnailsTest(SimpleTestCase):
+    """Only the srcset variants of the deleted curated thumbnail are removed from storage."""
+
+    def test_delete(self):
+        import tempfile
+
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import FileSystemStorage
+
+        from . import models
+
+        with tempfile.TemporaryDirectory() as media_root:
+            storage = FileSystemStorage(location=media_root)
+            names = [
+                f'{models.DERIVED_THUMBNAILS_DIR}/{_name}' for _name in ('7_320.webp', '7_640.webp', '17_320.webp')]
+            for name in names:
+                storage.save(name, ContentFile(b'webp'))
+            with mock.patch.object(models, 'storage', storage):
+                models.delete_derived_thumbnails(7)
+            self.assertEqual([storage.exists(_name) for _name in names], [False, False, True])
+
+    def test_no_derived_directory(self):
+        import tempfile
+
+        from django.core.files.storage import FileSystemStorage
+
+        from . import models
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                mock.patch.object(models, 'storage', FileSystemStorage(location=media_root)):
+            models.delete_derived_thumbnails(7)
+
+
+@override_settings(DEBUG=False)
+class ForbiddenProxyUrlTest(SimpleTestCase):
+    """The proxy and the print job views share the host allowlist check."""
+
+    CAPABILITIES_URL = 'http://example.org/pdf/create.json?version=1.3.0&request=GetCapabilities&service=WMS'
+
+    def test_allowed_host(self):
+        from urllib.parse import urlsplit
+
+        from . import proxy_utils
+
+        with mock.patch.object(proxy_utils, 'is_proxy_host_allowed', return_value=True):
+            self.assertIsNone(proxy_utils.forbidden_proxy_url(urlsplit('http://example.org/pdf/create.json')))
+
+    def test_ows_capabilities(self):
+        from urllib.parse import urlsplit
+
+        from . import proxy_utils
+
+        url = urlsplit(self.CAPABILITIES_URL)
+        with mock.patch.object(proxy_utils, 'is_proxy_host_allowed', return_value=False):
+            self.assertIsNone(proxy_utils.forbidden_proxy_url(url))
+            self.assertEqual(proxy_utils.forbidden_proxy_url(url, allow_ows_capabilities=False).status_code, 403)
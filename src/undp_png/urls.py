@@ -22,7 +22,8 @@ from django.conf.urls import url
 from django.views.generic import TemplateView
 from geonode.base import register_url_event
 from geonode.urls import urlpatterns
-from undp_png.views import thumbnail_upload, proxy
+from undp_png.views import thumbnail_upload, proxy, print_job_create, print_job_status, invitation_status, \
+    task_metrics
 
 urlpatterns += [
     ## include your urls here
@@ -35,6 +36,17 @@ urlpatterns += [
     # Curated Thumbnail Large
     url(r'^base/(?P<res_id>[^/]+)/thumbnail_upload_large$', thumbnail_upload,
         name='thumbnail_upload_large'),
+    # Asynchronous MapFish printing
+    url(r'^print/jobs/$', print_job_create,
+        name='print_job_create'),
+    url(r'^print/jobs/(?P<job_id>[0-9a-f-]+)/$', print_job_status,
+        name='print_job_status'),
+    # Delivery progress of the invitations sent by the current user
+    url(r'^invitations/status/$', invitation_status,
+        name='invitation_status'),
+    # Prometheus scrape target for the Celery task metrics
+    url(r'^metrics/tasks/$', task_metrics,
+        name='task_metrics'),
 
 ]
 
@@ -6,37 +6,44 @@
 """
 import gzip
 import io
+import json
 import logging
 import re
-from distutils.version import StrictVersion
-from json import JSONDecodeError
 from urllib.parse import urljoin, urlparse, urlsplit
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from django.http import HttpResponse
 from django.http import HttpResponseRedirect
-from django.http.request import validate_host
-from django.shortcuts import render
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
 from django.views.decorators.csrf import requires_csrf_token
+from django.views.decorators.http import require_GET, require_POST
 from geonode.base.models import (
     ResourceBase
 )
 
 from .forms import CuratedThumbnailForm
+from .models import PrintJob
+from .printing import is_print_request, print_job_headers, rewrite_print_spec
+from .proxy_utils import (
+    forbidden_proxy_url,
+    iter_upstream_content,
+    proxy_request,
+    proxy_response_cache,
+    response_cache_key,
+    to_local_geoserver,
+    to_public_geoserver,
+)
 
-try:
-    import json
-except ImportError:
-    from django.utils import simplejson as json
 from hyperlink import URL
 
-from geonode import geoserver  # noqa
-from geonode.proxy.views import TIMEOUT, ows_regexp, fetch_response_headers
+from geonode.proxy.views import TIMEOUT, fetch_response_headers
 from geonode.utils import (
-    check_ogc_backend,
     get_headers,
-    http_client,
     resolve_object,
 )
 
@@ -47,13 +54,15 @@ logger = logging.getLogger(__name__)
 @requires_csrf_token
 def proxy(request, url=None, response_callback=None,
           sec_chk_hosts=True, sec_chk_rules=True, timeout=None,
-          allowed_hosts=[], **kwargs):
+          allowed_hosts=[], stream=None, **kwargs):
     # Request default timeout
     if not timeout:
         timeout = TIMEOUT
 
-    # Security rules and settings
-    PROXY_ALLOWED_HOSTS = getattr(settings, 'PROXY_ALLOWED_HOSTS', ())
+    # Stream upstream bodies unless a response_callback needs the full content
+    if stream is None:
+        stream = getattr(settings, 'PROXY_STREAMING_ENABLED', False)
+    stream = stream and not response_callback
 
     # Sanity url checks
     if 'url' not in request.GET and not url:
@@ -76,44 +85,10 @@ def proxy(request, url=None, response_callback=None,
 
     # White-Black Listing Hosts
     site_url = urlsplit(settings.SITEURL)
-    if sec_chk_hosts and not settings.DEBUG:
-
-        # Attach current SITEURL
-        if site_url.hostname not in PROXY_ALLOWED_HOSTS:
-            PROXY_ALLOWED_HOSTS += (site_url.hostname,)
-
-        # Attach current hostname
-        if check_ogc_backend(geoserver.BACKEND_PACKAGE):
-            from geonode.geoserver.helpers import ogc_server_settings
-            hostname = (
-                ogc_server_settings.hostname,
-            ) if ogc_server_settings else ()
-            if hostname not in PROXY_ALLOWED_HOSTS:
-                PROXY_ALLOWED_HOSTS += hostname
-
-        # Check OWS regexp
-        if url.query and ows_regexp.match(url.query):
-            ows_tokens = ows_regexp.match(url.query).groups()
-            if len(ows_tokens) == 4 and 'version' == ows_tokens[0] and StrictVersion(
-                    ows_tokens[1]) >= StrictVersion("1.0.0") and StrictVersion(
-                ows_tokens[1]) <= StrictVersion("3.0.0") and ows_tokens[2].lower() in (
-                    'getcapabilities') and ows_tokens[3].upper() in ('OWS', 'WCS', 'WFS', 'WMS', 'WPS', 'CSW'):
-                if url.hostname not in PROXY_ALLOWED_HOSTS:
-                    PROXY_ALLOWED_HOSTS += (url.hostname,)
-
-        # Check Remote Services base_urls
-        from geonode.services.models import Service
-        for _s in Service.objects.all():
-            _remote_host = urlsplit(_s.base_url).hostname
-            PROXY_ALLOWED_HOSTS += (_remote_host,)
-
-        if not validate_host(
-                url.hostname, PROXY_ALLOWED_HOSTS):
-            return HttpResponse("DEBUG is set to False but the host of the path provided to the proxy service"
-                                " is not in the PROXY_ALLOWED_HOSTS setting.",
-                                status=403,
-                                content_type="text/plain"
-                                )
+    if sec_chk_hosts:
+        forbidden = forbidden_proxy_url(url)
+        if forbidden is not None:
+            return forbidden
 
     # Security checks based on rules; allow only specific requests
     if sec_chk_rules:
@@ -143,56 +118,29 @@ def proxy(request, url=None, response_callback=None,
         _url = f'{_url}{query_separator}access_token={access_token}'
 
     _data = request.body.decode('utf-8')
-    print_re = re.compile(r'/pdf/create.json', re.I)
-    if print_re.search(_url):
-        try:
-            json_data = json.loads(_data)
-            logger.debug(json_data)
-            print(json_data)
-            # check for all requests first and layer['type'].lower() == "wmts"
-            contains_mapbox_req = 'layers' in json.loads(_data) and any(['mapbox' in layer.get('baseURL',"")
-                                                                         for layer in json_data.get('layers', []) if 'baseURL' in layer])
-            # Add Mapbox access token to customParams on any WMTS requests to mapbox
-            if request.method == "POST" and contains_mapbox_req:
-                for layer in json_data.get('layers', []):
-                    if 'mapbox' in layer.get('baseURL',""):
-                        # Geonode is setting WMTS customParams with a space try adding both ??? :q!
-                        if 'customParams ' in layer:
-                            layer['customParams ']['access_token'] = settings.MAPBOX_ACCESS_TOKEN
-                        else:
-                            layer['customParams '] = {'access_token': settings.MAPBOX_ACCESS_TOKEN}
-                            # remove typO from customParams
-                            del layer['customParams ']
-                        if 'customParams' in layer:
-                            layer['customParams']['access_token'] = settings.MAPBOX_ACCESS_TOKEN
-                        else:
-                            layer['customParams'] = {'access_token': settings.MAPBOX_ACCESS_TOKEN}
-                        if layer.get("type", "") == "xyz":
-                            # remove mapbox token
-                            layer["path_format"] = layer.get("path_format","").split("?")[0]
-                _data = json.dumps(json_data)
-                print("Changed data found mapbox layer")
-
-            logger.debug(_data)
-            print(_data)
-        except JSONDecodeError as exc:
-            logger.exception(exc)
+    if is_print_request(_url):
+        _data = rewrite_print_spec(_data, request.method)
 
     # Avoid translating local geoserver calls into external ones
-    if check_ogc_backend(geoserver.BACKEND_PACKAGE):
-        from geonode.geoserver.helpers import ogc_server_settings
-        _url = _url.replace(
-            f'{settings.SITEURL}geoserver',
-            ogc_server_settings.LOCATION.rstrip('/'))
-        _data = _data.replace(
-            f'{settings.SITEURL}geoserver',
-            ogc_server_settings.LOCATION.rstrip('/'))
-
-    response, content = http_client.request(
+    _url, _data = to_local_geoserver(_url, _data)
+
+    # Serve idempotent OGC GETs from the response cache, revalidating stale entries
+    cached = None
+    cache_key = None if response_callback else response_cache_key(request.method, _url, headers, request.user)
+    if cache_key:
+        stream = False
+        cached = proxy_response_cache.get(cache_key)
+        if cached is not None:
+            if cached.is_fresh():
+                return fetch_response_headers(cached.to_response(), cached.headers)
+            headers.update(cached.validators())
+
+    response, content = proxy_request(
         _url,
         method=request.method,
         data=_data.encode('utf-8'),
         headers=headers,
+        stream=stream,
         timeout=timeout,
         user=request.user)
     if response is None:
@@ -200,11 +148,27 @@ def proxy(request, url=None, response_callback=None,
             content=content,
             reason=content,
             status=500)
-    content = response.content or response.reason
     status = response.status_code
     response_headers = response.headers
     content_type = response.headers.get('Content-Type')
 
+    if cached is not None and status == 304:
+        proxy_response_cache.revalidate(cache_key, cached, response_headers)
+        return fetch_response_headers(cached.to_response(), cached.headers)
+
+    # Forward successful bodies chunk by chunk; errors, redirects and
+    # GZipped payloads are small and still go through the buffered path
+    if stream and status < 400 and status not in (301, 302, 303, 307) and content_type != 'gzip':
+        _response = StreamingHttpResponse(
+            streaming_content=iter_upstream_content(response),
+            status=status,
+            content_type=content_type)
+        return fetch_response_headers(_response, response_headers)
+
+    content = response.content or response.reason
+    if cache_key and status == 200 and content_type != 'gzip':
+        proxy_response_cache.set(cache_key, response)
+
     if status >= 400:
         _response = HttpResponse(
             content=content,
@@ -315,4 +279,106 @@ def thumbnail_upload(
     return render(request, template, context={
         'resource': res,
         'form': form
-    })
\ No newline at end of file
+    })
+
+
+@requires_csrf_token
+@require_POST
+def print_job_create(request):
+    """Queue a MapFish print spec for rendering by Celery and return its status url."""
+    raw_url = request.GET.get('url') or f"{settings.SITEURL}geoserver/pdf/create.json"
+    raw_url = urljoin(
+        settings.SITEURL,
+        raw_url) if raw_url.startswith("/") else raw_url
+    url = urlsplit(raw_url)
+    if not is_print_request(raw_url):
+        return HttpResponse("The print service requires a MapFish create.json URL.",
+                            status=400,
+                            content_type="text/plain"
+                            )
+    forbidden = forbidden_proxy_url(url, allow_ows_capabilities=False)
+    if forbidden is not None:
+        return forbidden
+
+    headers, access_token = get_headers(request, url, raw_url)
+
+    # Avoid translating local geoserver calls into external ones
+    _url, _data = to_local_geoserver(raw_url, rewrite_print_spec(request.body.decode('utf-8'), request.method))
+
+    from .tasks import submit_print_job
+    owner = request.user if request.user.is_authenticated else None
+    job = PrintJob.objects.create(owner=owner)
+    _headers = print_job_headers(headers)
+    transaction.on_commit(lambda: submit_print_job.apply_async(
+        args=(str(job.id), _url, _data, _headers), kwargs={'user_id': owner.pk if owner else None}))
+    return JsonResponse({
+        'id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('print_job_status', args=[job.id]),
+    }, status=202)
+
+
+@require_GET
+def print_job_status(request, job_id):
+    """Report the status of a print job and, once rendered, the MapFish answer."""
+    job = get_object_or_404(PrintJob, id=job_id)
+    if job.owner_id and job.owner_id != request.user.pk and not request.user.is_superuser:
+        return HttpResponse(
+            'You are not allowed to access this print job',
+            status=403,
+            content_type='text/plain')
+
+    result = job.result
+    if job.status == PrintJob.STATUS_SUCCESS:
+        result = to_public_geoserver(result)
+        try:
+            result = json.loads(result)
+        except ValueError:
+            pass
+    return JsonResponse({
+        'id': str(job.id),
+        'status': job.status,
+        'result': result,
+    })
+
+
+@require_GET
+def invitation_status(request):
+    """Report the delivery progress of the invitations sent by the requesting user."""
+    from invitations.utils import get_invitation_model
+
+    if not request.user.is_authenticated:
+        return HttpResponse(
+            'You must be logged in to access your invitations',
+            status=403,
+            content_type='text/plain')
+    invitations = get_invitation_model().objects.filter(inviter=request.user).order_by('-created')
+    return JsonResponse({
+        'sent': invitations.filter(sent__isnull=False).count(),
+        'pending': invitations.filter(sent__isnull=True).count(),
+        'invitations': [
+            {
+                'email': _i.email,
+                'created': _i.created,
+                'sent': _i.sent,
+                'accepted': _i.accepted,
+            }
+            for _i in invitations[:100]
+        ],
+    })
+
+
+@require_GET
+def task_metrics(request):
+    """Celery task metrics in the Prometheus text format."""
+    from .metrics import prometheus_text
+
+    token = getattr(settings, 'TASK_METRICS_TOKEN', '')
+    authorized = request.user.is_superuser or (
+        token and request.META.get('HTTP_AUTHORIZATION', '') == f'Bearer {token}')
+    if not authorized:
+        return HttpResponse(
+            'You are not allowed to access the task metrics',
+            status=403,
+            content_type='text/plain')
+    return HttpResponse(prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')